@@ -0,0 +1,117 @@
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+# Wikipedia fetcher
+WIKI_FETCH_CONCURRENCY = _env_int("WIKI_FETCH_CONCURRENCY", 4)  # max upstream calls in flight
+WIKI_FETCH_TIMEOUT = _env_float("WIKI_FETCH_TIMEOUT", 10.0)  # seconds per attempt
+WIKI_FETCH_RETRIES = _env_int("WIKI_FETCH_RETRIES", 2)  # extra attempts after the first
+WIKI_FETCH_BACKOFF = _env_float("WIKI_FETCH_BACKOFF", 0.5)  # base delay, doubled per retry
+# Batched MediaWiki queries: many articles with all their properties per request
+WIKI_BATCH_ENABLED = os.getenv("WIKI_BATCH_ENABLED", "1") == "1"  # otherwise one wikipedia library page at a time
+WIKI_BATCH_SIZE = _env_int("WIKI_BATCH_SIZE", 20)  # articles per request, the API sends intro extracts for 20 at most
+WIKI_BATCH_CONTINUATIONS = _env_int("WIKI_BATCH_CONTINUATIONS", 4)  # follow-up requests for links past the first 500
+# Titles without a usable article are not asked for again for a while
+WIKI_NEGATIVE_TTL = _env_float("WIKI_NEGATIVE_TTL", 21600.0)  # seconds
+WIKI_NEGATIVE_MAX = _env_int("WIKI_NEGATIVE_MAX", 10000)  # titles remembered, oldest dropped
+# Circuit breaker: stop calling Wikipedia after consecutive failures, try again after a pause
+WIKI_BREAKER_THRESHOLD = _env_int("WIKI_BREAKER_THRESHOLD", 5)  # failed attempts in a row that open it
+WIKI_BREAKER_RESET = _env_float("WIKI_BREAKER_RESET", 30.0)  # seconds open before one trial call
+
+# Live candidate generation when the prefetcher is off
+FEED_FETCH_CONCURRENCY = _env_int("FEED_FETCH_CONCURRENCY", 5)  # article fetches in flight per feed request
+FEED_FETCH_DEADLINE = _env_float("FEED_FETCH_DEADLINE", 8.0)  # seconds before a feed returns what it has
+
+# Sparse interest-vs-article ranking (needs numpy and scipy)
+RANKING_ENABLED = os.getenv("RANKING_ENABLED", "1") == "1"
+RANKING_MERGE_ROWS = _env_int("RANKING_MERGE_ROWS", 1024)  # new articles buffered before joining the main matrix
+
+# Interest score decay
+# Changing the half-life rescales every stored score once, at the next startup
+INTEREST_HALF_LIFE_DAYS = _env_float("INTEREST_HALF_LIFE_DAYS", 14.0)  # an untouched interest halves this often
+INTEREST_PRUNE_BELOW = _env_float("INTEREST_PRUNE_BELOW", 0.5)  # decayed scores below this are deleted
+INTEREST_COMPACT_INTERVAL = _env_float("INTEREST_COMPACT_INTERVAL", 3600.0)  # seconds between prune passes
+INTEREST_REANCHOR_HALF_LIVES = _env_float("INTEREST_REANCHOR_HALF_LIVES", 16.0)  # epoch age that triggers a rescale
+
+# Per-user queues of ready feed items
+FEED_QUEUE_ENABLED = os.getenv("FEED_QUEUE_ENABLED", "1") == "1"
+FEED_QUEUE_SIZE = _env_int("FEED_QUEUE_SIZE", 20)  # items kept ready per user
+FEED_QUEUE_LOW_WATERMARK = _env_int("FEED_QUEUE_LOW_WATERMARK", 10)  # refill when fewer remain
+FEED_QUEUE_MAX_USERS = _env_int("FEED_QUEUE_MAX_USERS", 2000)  # least recently active users are dropped
+FEED_QUEUE_IDLE = _env_float("FEED_QUEUE_IDLE", 900.0)  # seconds without a feed request before a queue is dropped
+FEED_QUEUE_REBUILD_INTERVAL = _env_float("FEED_QUEUE_REBUILD_INTERVAL", 30.0)  # min seconds between rebuilds per user
+
+# Background prefetcher
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_POOL_SIZE = _env_int("PREFETCH_POOL_SIZE", 50)  # unseen random articles to keep cached
+PREFETCH_INTEREST_TAGS = _env_int("PREFETCH_INTEREST_TAGS", 20)  # top interest tags to keep cached
+PREFETCH_RATE = _env_float("PREFETCH_RATE", 2.0)  # max Wikipedia fetches per second, a batch counts once
+PREFETCH_INTERVAL = _env_float("PREFETCH_INTERVAL", 30.0)  # seconds between pool checks
+
+# Write-behind event queue for views, shares and like signals
+EVENT_QUEUE_ENABLED = os.getenv("EVENT_QUEUE_ENABLED", "1") == "1"
+EVENT_FLUSH_SIZE = _env_int("EVENT_FLUSH_SIZE", 200)  # flush once this many events are pending
+EVENT_FLUSH_INTERVAL = _env_float("EVENT_FLUSH_INTERVAL", 1.0)  # ...or after this many seconds
+EVENT_MAX_PENDING = _env_int("EVENT_MAX_PENDING", 10000)  # producers flush inline above this
+
+# Server-side seen-sets behind the feed session cursor
+SEEN_FILTER_BITS = _env_int("SEEN_FILTER_BITS", 32768)  # Bloom filter size per session (4 KB)
+SEEN_FILTER_HASHES = _env_int("SEEN_FILTER_HASHES", 4)
+SEEN_MAX_SESSIONS = _env_int("SEEN_MAX_SESSIONS", 5000)  # least recently used sessions are dropped
+SEEN_SEED_LIMIT = _env_int("SEEN_SEED_LIMIT", 2000)  # most recent views loaded into a new session
+SEEN_SESSION_TTL = _env_float("SEEN_SESSION_TTL", 21600.0)  # seconds a session is kept in the shared store
+
+# In-process cache of built article payloads
+PAYLOAD_CACHE_SIZE = _env_int("PAYLOAD_CACHE_SIZE", 5000)  # articles kept, least recently used evicted
+PAYLOAD_CACHE_TTL = _env_float("PAYLOAD_CACHE_TTL", 3600.0)  # seconds
+ACCESS_FLUSH_INTERVAL = _env_float("ACCESS_FLUSH_INTERVAL", 30.0)  # seconds between access_count flushes
+
+# Comment threads are served in pages of COMMENTS_PAGE_SIZE, clients may ask for up to COMMENTS_MAX_PAGE
+COMMENTS_PAGE_SIZE = _env_int("COMMENTS_PAGE_SIZE", 20)
+COMMENTS_MAX_PAGE = _env_int("COMMENTS_MAX_PAGE", 100)
+
+# Username -> user id cache behind the username cookie
+USER_CACHE_SIZE = _env_int("USER_CACHE_SIZE", 10000)  # users kept, least recently used evicted
+
+# Request metrics on /metrics (per worker process)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0") == "1"  # add a Server-Timing header to responses
+SLOW_REQUEST_MS = _env_float("SLOW_REQUEST_MS", 1000.0)  # log requests slower than this as JSON lines, 0 disables
+SLOW_REQUEST_SAMPLE = _env_float("SLOW_REQUEST_SAMPLE", 1.0)  # fraction of slow requests logged
+
+# SQLite storage profile: "wal" (WAL + tuned pragmas + read-only pool) or "legacy" (driver defaults)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "wal")
+# The page cache is private to each connection: its worst case is the per-connection size times
+# (SQLITE_POOL_SIZE + SQLITE_MAX_OVERFLOW) write plus (READ_POOL_SIZE + SQLITE_MAX_OVERFLOW) read
+# connections, 35 by default, times WEB_CONCURRENCY workers. The budget is split over those connections;
+# the memory map below is the OS page cache and shared by all of them.
+SQLITE_CACHE_BUDGET_KB = _env_int("SQLITE_CACHE_BUDGET_KB", 131072)  # page cache for all connections of one worker
+SQLITE_CACHE_SIZE_KB = _env_int("SQLITE_CACHE_SIZE_KB", 0)  # per connection, 0 splits the budget
+SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 268435456)  # bytes of the file mapped into memory
+SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_POOL_SIZE = _env_int("SQLITE_POOL_SIZE", 5)  # write pool
+SQLITE_MAX_OVERFLOW = _env_int("SQLITE_MAX_OVERFLOW", 10)  # extra connections per pool under load
+READ_POOL_SIZE = _env_int("READ_POOL_SIZE", 10)
+
+# Server database pools (PostgreSQL); SQLite uses the profile above
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 10.0)  # seconds to wait for a free connection
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)  # seconds before a connection is replaced
+
+# Multi-worker mode: uvicorn --workers and gunicorn both read WEB_CONCURRENCY
+WORKERS = _env_int("WEB_CONCURRENCY", 1)
+LEADER_LOCK_FILE = os.getenv("LEADER_LOCK_FILE", "./thinktok.leader.lock")  # held by the worker running singleton tasks
+LEADER_RETRY_INTERVAL = _env_float("LEADER_RETRY_INTERVAL", 5.0)  # seconds between takeover attempts
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")  # redis://host:6379/0, memory:// (in-process stand-in) or empty
+CONTENT_SYNC_INTERVAL = _env_float("CONTENT_SYNC_INTERVAL", 5.0)  # seconds between picking up articles other workers cached
+
+# Apply pending schema migrations in main.lifespan (otherwise run `python migrations.py`)
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
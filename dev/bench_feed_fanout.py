@@ -0,0 +1,79 @@
+"""Latency of /api/feed/more when every candidate has to come from Wikipedia.
+
+The prefetcher is disabled so each page goes through live candidate generation
+against a local fake Wikipedia with injected latency. Without --concurrency the
+sequential (1) and default fan-out settings run in turn, each in a fresh process.
+
+    python dev/bench_feed_fanout.py --latency 0.3 --pages 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def run(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    os.environ["PREFETCH_ENABLED"] = "0"
+    os.environ["FEED_FETCH_CONCURRENCY"] = str(args.concurrency)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/fanout.db"
+
+    import httpx
+    import wikipedia.wikipedia
+    from fake_wiki import FakeWiki
+    from database import engine, Base, AsyncSessionLocal
+    from models import User, UserInterest
+    from migrations import run_migrations
+    from services.interest_decay import ensure_anchor, stored_score
+    import main
+
+    fake = FakeWiki(latency=args.latency).start()
+    wikipedia.wikipedia.API_URL = fake.url
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+        # Scores are stored scaled to the decay epoch
+        await ensure_anchor(conn)
+    async with AsyncSessionLocal() as db:
+        user = User(username="bench")
+        db.add(user)
+        await db.flush()
+        db.add_all(UserInterest(user_id=user.id, category_or_tag=f"Topic {i}", score=stored_score(float(i))) for i in range(20))
+        await db.commit()
+
+    latencies, served = [], 0
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"username": "bench"}) as client:
+        cursor = ""
+        for _ in range(args.pages):
+            start = time.perf_counter()
+            response = await client.get("/api/feed/more", params={"cursor": cursor})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            body = response.json()
+            cursor = body.get("cursor", cursor)
+            served += len(body["items"])
+
+    fake.stop()
+    print(f"concurrency={args.concurrency:<3} p50={statistics.median(latencies):8.1f}ms  max={max(latencies):8.1f}ms  "
+          f"items/page={served / args.pages:.1f}  upstream requests={fake.requests}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds added to every upstream request")
+    parser.add_argument("--pages", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.concurrency:
+        asyncio.run(run(args))
+    else:
+        for concurrency in (1, 5):
+            subprocess.run([sys.executable, "-W", "ignore", __file__, "--concurrency", str(concurrency)] + sys.argv[1:], check=True)
@@ -0,0 +1,113 @@
+"""/api/feed/more latency with and without the per-user feed queues.
+
+Seeds a throwaway database with tagged articles and users who already have
+interests, then has every user page through /api/feed/more and report views of
+what they were served. The prefetcher runs against a local fake Wikipedia so the
+pool stays warm. Without --queues both settings run in turn, each in a fresh
+process.
+
+    python dev/bench_feed_queue.py --users 50 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def percentile(samples: list, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+async def run(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    os.environ["FEED_QUEUE_ENABLED"] = "1" if args.queues == "on" else "0"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/queues.db"
+
+    import json
+    import httpx
+    import wikipedia.wikipedia
+    from fake_wiki import FakeWiki
+    from database import engine, Base, AsyncSessionLocal
+    from models import User, WikiContent, ContentTag, UserInterest
+    from migrations import run_migrations
+    from services.interest_decay import ensure_anchor, stored_score
+    import main
+
+    fake = FakeWiki(latency=0.05).start()
+    wikipedia.wikipedia.API_URL = fake.url
+
+    tags = [f"Topic {i}" for i in range(args.tags)]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+        # Scores are stored scaled to the decay epoch; anchored now, startup leaves them as they are
+        await ensure_anchor(conn)
+    async with AsyncSessionLocal() as db:
+        for i in range(args.articles):
+            article_tags = random.sample(tags, 5)
+            content_id = f"{i:016x}"
+            db.add(WikiContent(content_id=content_id, title=f"Article {i}", summary="Seeded article. " * 20,
+                               related_links="[]", categories=json.dumps(article_tags)))
+            db.add_all(ContentTag(content_id=content_id, tag=tag) for tag in article_tags)
+        db.add_all(User(username=f"user{i}") for i in range(args.users))
+        await db.flush()
+        for i in range(args.users):
+            db.add_all(UserInterest(user_id=i + 1, category_or_tag=tag, score=stored_score(random.uniform(1, 10)))
+                       for tag in random.sample(tags, 20))
+        await db.commit()
+
+    transport = httpx.ASGITransport(app=main.app)
+    latencies, errors = [], 0
+    async with main.app.router.lifespan_context(main.app):
+        deadline = time.monotonic() + args.seconds
+
+        async def swipe(username: str):
+            nonlocal errors
+            cursor = ""
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"username": username}) as client:
+                while time.monotonic() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get("/api/feed/more", params={"cursor": cursor})
+                        response.raise_for_status()
+                    except Exception:
+                        errors += 1
+                        continue
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    body = response.json()
+                    cursor = body.get("cursor", cursor)
+                    for item in body["items"]:
+                        await client.post("/api/track_view", json={"content_id": item["content_id"], "view_duration": 3})
+                    await asyncio.sleep(args.think)
+
+        await asyncio.gather(*(swipe(f"user{i}") for i in range(args.users)))
+        stats = (await httpx.AsyncClient(transport=transport, base_url="http://bench").get("/api/stats")).json()
+
+    fake.stop()
+    queues = stats["feed_queues"]
+    print(f"queues {args.queues:<3} pages {len(latencies):6d}  p50={percentile(latencies, 0.5):7.1f}ms  "
+          f"p99={percentile(latencies, 0.99):7.1f}ms  errors {errors}  "
+          f"served from queue {queues['served']}, short pops {queues['short']}, rebuilds {queues['rebuilds']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queues", choices=["on", "off"])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--think", type=float, default=0.2, help="seconds between pages per user")
+    args = parser.parse_args()
+
+    if args.queues:
+        asyncio.run(run(args))
+    else:
+        for queues in ("off", "on"):
+            subprocess.run([sys.executable, "-W", "ignore", __file__, "--queues", queues] + sys.argv[1:], check=True)
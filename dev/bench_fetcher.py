@@ -0,0 +1,89 @@
+"""Cache-only feed latency while slow Wikipedia fetches are in flight.
+
+Starts a local fake Wikipedia with injected latency, seeds a throwaway SQLite
+database and measures /api/feed before and during a burst of /api/load_more
+calls. `--blocking` runs the fetches inline on the event loop, as they used to.
+
+    python dev/bench_fetcher.py --latency 0.5 --slow-requests 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+import wikipedia.wikipedia
+from fake_wiki import FakeWiki
+from database import engine, Base, AsyncSessionLocal
+from models import User, WikiContent
+from services import wiki_fetcher
+import main
+
+
+async def seed(articles: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(User(username="bench"))
+        for i in range(articles):
+            db.add(WikiContent(
+                content_id=f"seed{i:012d}", title=f"Seed {i}", summary="Seeded article. " * 20,
+                related_links="[]", categories="[]", access_count=0
+            ))
+        await db.commit()
+
+
+async def feed_latencies(client: httpx.AsyncClient, n: int) -> list:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = await client.get("/api/feed")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+def report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<28} p50={statistics.median(latencies):8.1f}ms  p99={p99:8.1f}ms  max={latencies[-1]:8.1f}ms")
+
+
+async def run(args):
+    fake = FakeWiki(latency=args.latency).start()
+    wikipedia.wikipedia.API_URL = fake.url
+
+    if args.blocking:
+        async def blocking_call(fn, *call_args):
+            return fn(*call_args)
+        wiki_fetcher._call = blocking_call
+
+    await seed(args.articles)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"username": "bench"}) as client:
+        report("feed, idle", await feed_latencies(client, args.samples))
+
+        slow = [asyncio.create_task(client.get("/api/load_more")) for _ in range(args.slow_requests)]
+        await asyncio.sleep(0.05)
+        report("feed, fetches in flight", await feed_latencies(client, args.samples))
+        await asyncio.gather(*slow)
+
+    fake.stop()
+    print(f"fake wikipedia served {fake.requests} requests")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds added to every upstream request")
+    parser.add_argument("--slow-requests", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--blocking", action="store_true", help="call wikipedia on the event loop (old behaviour)")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,80 @@
+"""Sustained /api/track_view throughput with and without the write-behind queue.
+
+Seeds a throwaway SQLite database, then fires track_view requests from many
+concurrent clients. `--direct` leaves the flusher stopped so every request
+writes and commits inline, like the old handler.
+
+    python dev/bench_ingest.py --events 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "ingest.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+
+import httpx
+from database import engine, Base, AsyncSessionLocal
+from models import User, WikiContent
+from services.event_queue import event_queue
+import main
+
+
+async def seed(users: int, articles: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add_all(User(username=f"user{i}") for i in range(users))
+        db.add_all(
+            WikiContent(content_id=f"{i:016x}", title=f"Article {i}", summary="...", related_links="[]", categories="[]")
+            for i in range(articles)
+        )
+        await db.commit()
+
+
+async def client_loop(transport, username: str, events: list, articles: int):
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"username": username}) as client:
+        while events:
+            events.pop()
+            response = await client.post("/api/track_view", json={
+                "content_id": f"{random.randrange(articles):016x}", "view_duration": random.uniform(1.5, 20)
+            })
+            response.raise_for_status()
+
+
+async def run(args):
+    await seed(args.users, args.articles)
+    if not args.direct:
+        event_queue.start()
+
+    transport = httpx.ASGITransport(app=main.app)
+    events = list(range(args.events))
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client_loop(transport, f"user{i % args.users}", events, args.articles) for i in range(args.concurrency)
+    ))
+    accepted = time.perf_counter() - start
+    await event_queue.stop()
+    persisted = time.perf_counter() - start
+
+    views = sqlite3.connect(DB_PATH).execute("SELECT COUNT(*) FROM views").fetchone()[0]
+    mode = "direct commits" if args.direct else "write-behind queue"
+    print(f"{mode}: {args.events / accepted:8.0f} events/s accepted, "
+          f"{args.events / persisted:8.0f} events/s persisted, {views} views written")
+    print(event_queue.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--direct", action="store_true", help="commit every event inline (old behaviour)")
+    asyncio.run(run(parser.parse_args()))
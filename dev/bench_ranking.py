@@ -0,0 +1,78 @@
+"""Ranking engine build and scoring cost on a synthetic catalogue.
+
+Generates articles with Zipf-distributed tags and users with 20 interests each,
+then times the matrix build, single-user top-k, incremental inserts and
+batched top-k for every user. No database or network is involved.
+
+    python dev/bench_ranking.py --articles 100000 --users 10000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from services.ranking_service import RankingEngine
+
+
+def zipf_tags(rng: np.random.Generator, vocabulary: int, n: int) -> list:
+    return [f"Tag {t}" for t in set((rng.zipf(1.3, n) - 1) % vocabulary)]
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+    engine = RankingEngine()
+
+    start = time.perf_counter()
+    for i in range(args.articles):
+        engine.add(f"{i:016x}", zipf_tags(rng, args.vocabulary, args.tags))
+    engine._merge()
+    engine._loaded = True
+    print(f"build          {args.articles} articles, {len(engine._vocabulary)} tags in {time.perf_counter() - start:6.2f}s "
+          f"({engine._main.nnz} non-zeros)")
+
+    profiles = [
+        [(tag, float(rng.integers(1, 50))) for tag in zipf_tags(rng, args.vocabulary, args.interests)]
+        for _ in range(args.users)
+    ]
+
+    latencies = []
+    for interests in random.sample(profiles, min(args.samples, len(profiles))):
+        start = time.perf_counter()
+        engine.top_k(interests, args.k, exclude=set())
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(f"top_k          p50={statistics.median(latencies):7.2f}ms  p99={latencies[int(len(latencies) * 0.99)]:7.2f}ms")
+
+    start = time.perf_counter()
+    for i in range(args.inserts):
+        engine.add(f"new{i:013x}", zipf_tags(rng, args.vocabulary, args.tags))
+    insert_ms = (time.perf_counter() - start) * 1000 / args.inserts
+    start = time.perf_counter()
+    engine.top_k(profiles[0], args.k)
+    print(f"insert         {insert_ms:7.3f}ms each, next top_k with {len(engine._pending)} pending rows "
+          f"{(time.perf_counter() - start) * 1000:7.2f}ms")
+
+    start = time.perf_counter()
+    engine.top_k_many(profiles, args.k)
+    elapsed = time.perf_counter() - start
+    print(f"top_k_many     {args.users} users in {elapsed:6.2f}s ({elapsed * 1000 / args.users:.2f}ms per user)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--vocabulary", type=int, default=50000, help="distinct tags to draw from")
+    parser.add_argument("--tags", type=int, default=15, help="tags drawn per article")
+    parser.add_argument("--interests", type=int, default=20, help="tags drawn per user")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--inserts", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
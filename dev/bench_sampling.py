@@ -0,0 +1,98 @@
+"""Compare the old full-table shuffle with indexed sampling for the cold feed.
+
+Seeds a throwaway SQLite database with N cached articles and times picking five
+unseen items both ways.
+
+    python dev/bench_sampling.py --sizes 1000,100000,1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from database import Base
+from models import WikiContent
+from services.sampling_service import ContentIdIndex
+from services.wiki_service import content_to_item
+
+
+def seed(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO wiki_content (content_id, title, summary, image_url, related_links, categories, access_count) "
+        "VALUES (?, ?, ?, NULL, '[]', '[]', 0)",
+        ((f"{i:016x}", f"Article {i}", f"Summary of article {i}. " * 10) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+async def legacy_sample(db: AsyncSession, count: int, exclude: set) -> list:
+    result = await db.execute(select(WikiContent))
+    cached_items = result.scalars().all()
+    random.shuffle(cached_items)
+    return [content_to_item(c) for c in cached_items if c.content_id not in exclude][:count]
+
+
+async def indexed_sample(db: AsyncSession, index: ContentIdIndex, count: int, exclude: set) -> list:
+    content_ids = index.sample(count, exclude)
+    result = await db.execute(select(WikiContent).where(WikiContent.content_id.in_(content_ids)))
+    return [content_to_item(c) for c in result.scalars().all()]
+
+
+async def timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def bench_size(rows: int, runs: int, skip_legacy_above: int):
+    path = os.path.join(tempfile.mkdtemp(), "sampling.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    seed(path, rows)
+
+    Session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    exclude = {f"{i:016x}" for i in random.sample(range(rows), min(rows // 2, 500))}
+    async with Session() as db:
+        index = ContentIdIndex()
+        start = time.perf_counter()
+        await index.ensure_loaded(db)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        indexed_ms = await timed(lambda: indexed_sample(db, index, 5, exclude), runs)
+        if rows <= skip_legacy_above:
+            legacy_ms = await timed(lambda: legacy_sample(db, 5, exclude), max(1, runs // 10))
+            legacy = f"{legacy_ms:10.2f}ms"
+        else:
+            legacy = "   skipped"
+
+    await engine.dispose()
+    print(f"{rows:>9} rows  full shuffle {legacy}  indexed {indexed_ms:8.3f}ms  (one-off index load {load_ms:.0f}ms)")
+
+
+async def run(args):
+    for rows in (int(s) for s in args.sizes.split(",")):
+        await bench_size(rows, args.runs, args.skip_legacy_above)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--skip-legacy-above", type=int, default=1000000,
+                        help="the full shuffle hydrates every row, skip it for larger caches")
+    asyncio.run(run(parser.parse_args()))
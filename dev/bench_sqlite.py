@@ -0,0 +1,91 @@
+"""Mixed read/write latency under each SQLite storage profile.
+
+Readers loop over /api/feed, /api/profile and /api/comments while writers post
+comments and toggle likes, all against a throwaway database. Without
+--profile both profiles run in turn, each in a fresh process.
+
+    python dev/bench_sqlite.py --seconds 10 --readers 40 --writers 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def percentile(samples: list, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+async def run(args):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    os.environ["SQLITE_PROFILE"] = args.profile
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/mixed.db"
+
+    import httpx
+    from database import engine, Base, AsyncSessionLocal
+    from models import User, WikiContent
+    import main
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add_all(User(username=f"user{i}") for i in range(args.readers + args.writers))
+        db.add_all(
+            WikiContent(content_id=f"{i:016x}", title=f"Article {i}", summary="...", related_links="[]", categories="[]")
+            for i in range(args.articles)
+        )
+        await db.commit()
+
+    transport = httpx.ASGITransport(app=main.app)
+    reads, writes, errors = [], [], 0
+    deadline = time.monotonic() + args.seconds
+
+    async def worker(username: str, is_writer: bool):
+        nonlocal errors
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"username": username}) as client:
+            while time.monotonic() < deadline:
+                content_id = f"{random.randrange(args.articles):016x}"
+                start = time.perf_counter()
+                try:
+                    if is_writer:
+                        if random.random() < 0.5:
+                            response = await client.post("/api/comments", json={"content_id": content_id, "text": "bench"})
+                        else:
+                            response = await client.post("/api/toggle_like", json={"content_id": content_id})
+                    else:
+                        path = random.choice(["/api/feed", "/api/profile", f"/api/comments/{content_id}"])
+                        response = await client.get(path)
+                    response.raise_for_status()
+                except Exception:
+                    errors += 1
+                    continue
+                (writes if is_writer else reads).append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(
+        *(worker(f"user{i}", False) for i in range(args.readers)),
+        *(worker(f"user{args.readers + i}", True) for i in range(args.writers))
+    )
+    print(f"{args.profile:<7} reads {len(reads) / args.seconds:7.0f}/s p50={percentile(reads, 0.5):7.1f}ms "
+          f"p99={percentile(reads, 0.99):7.1f}ms | writes {len(writes) / args.seconds:6.0f}/s "
+          f"p50={percentile(writes, 0.5):7.1f}ms p99={percentile(writes, 0.99):7.1f}ms | errors {errors}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", choices=["legacy", "wal"])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=40)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--articles", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.profile:
+        asyncio.run(run(args))
+    else:
+        for profile in ("legacy", "wal"):
+            subprocess.run([sys.executable, "-W", "ignore", __file__, "--profile", profile] + sys.argv[1:], check=True)
@@ -0,0 +1,320 @@
+"""Swipe-session load test: throughput, latency percentiles and SQL statements per endpoint.
+
+Seeds a throwaway SQLite database from a fixed random seed with N users, M
+tagged articles and K past interactions (views, likes, comments), starts a
+local fake Wikipedia and the app under uvicorn, then has client processes run
+swipe sessions as fast as the server answers:
+
+    login once, then sessions of --session-swipes articles: /api/me, /api/feed,
+    then per article track_view, sometimes toggle_like, sometimes open the
+    comment thread and post a comment; /api/feed/more whenever fewer than two
+    articles are left.
+
+Statements per request come from the Server-Timing header (METRICS_SERVER_TIMING).
+Requests in the first --warmup seconds are left out. Results are written as
+JSON, by default to bench_results/<commit>.json; --compare prints the change
+against an earlier file.
+
+    python dev/bench_suite.py --users 200 --articles 5000 --interactions 50000 --seconds 30
+    python dev/bench_suite.py --compare bench_results/e08f087.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+DEV_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(DEV_DIR, ".."))
+sys.path.insert(0, DEV_DIR)
+
+from bench_workers import percentile, free_port, wait_ready  # noqa: E402
+
+STATEMENTS = re.compile(r'db;dur=[\d.]+;desc="(\d+) statements"')
+
+
+# Seed data generators: deterministic for a given random.Random
+
+def generate_users(count: int):
+    for i in range(count):
+        yield {"id": i + 1, "username": f"user{i}"}
+
+
+def generate_articles(count: int, tags: list, rng: random.Random):
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        categories = rng.sample(tags, 4)
+        related = [f"Article {rng.randrange(count)}" for _ in range(5)]
+        yield {
+            "content_id": f"{i:016x}", "title": f"Article {i}", "summary": f"Article {i} is a seeded article. " * 20,
+            "image_url": None, "related_links": json.dumps(related), "categories": json.dumps(categories),
+            "created_at": now - timedelta(minutes=count - i), "last_accessed": now, "access_count": 0,
+        }
+
+
+def generate_interactions(count: int, users: int, articles: int, rng: random.Random):
+    """(kind, row) pairs, 75% views, 18% likes, 7% comments"""
+    now = datetime.now(timezone.utc)
+    liked = set()
+    for _ in range(count):
+        # Skewed picks: low ids are the active users and popular articles
+        user_id = int(users * rng.random() ** 2) + 1
+        content_id = f"{int(articles * rng.random() ** 3):016x}"
+        roll = rng.random()
+        if roll < 0.75:
+            yield "views", {"user_id": user_id, "content_id": content_id, "view_duration": rng.uniform(1, 20),
+                            "timestamp": now - timedelta(seconds=rng.randrange(86400 * 30))}
+        elif roll < 0.93:
+            if (user_id, content_id) not in liked:
+                liked.add((user_id, content_id))
+                yield "likes", {"user_id": user_id, "content_id": content_id}
+        else:
+            yield "comments", {"user_id": user_id, "content_id": content_id, "text": f"Seeded comment {rng.random():.6f}"}
+
+
+async def seed(args) -> dict:
+    from sqlalchemy import insert
+    from database import engine, Base
+    from models import User, WikiContent, ContentTag, UserInterest, View, Like, Comment
+    from migrations import run_migrations
+    from services.interest_decay import ensure_anchor, stored_score
+    from services.wiki_service import item_tags
+    from services.counter_service import rebuild_counters
+
+    rng = random.Random(args.seed)
+    tags = [f"Topic {i}" for i in range(args.tags)]
+    tables = {"views": View, "likes": Like, "comments": Comment}
+    counts = {"users": args.users, "articles": args.articles, "views": 0, "likes": 0, "comments": 0}
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+        # Scores are stored scaled to the decay epoch; anchored now, startup leaves them as they are
+        await ensure_anchor(conn)
+        await conn.execute(insert(User), list(generate_users(args.users)))
+        articles = list(generate_articles(args.articles, tags, rng))
+        await conn.execute(insert(WikiContent), articles)
+        await conn.execute(insert(ContentTag), [
+            {"content_id": article["content_id"], "tag": tag}
+            for article in articles
+            for tag in dict.fromkeys(item_tags({"categories": json.loads(article["categories"]),
+                                                "related": json.loads(article["related_links"])}))
+        ])
+        await conn.execute(insert(UserInterest), [
+            {"user_id": user_id, "category_or_tag": tag, "score": stored_score(rng.uniform(1, 10))}
+            for user_id in range(1, args.users + 1) for tag in rng.sample(tags, 20)
+        ])
+        rows = {kind: [] for kind in tables}
+        for kind, row in generate_interactions(args.interactions, args.users, args.articles, rng):
+            rows[kind].append(row)
+        for kind, model in tables.items():
+            if rows[kind]:
+                await conn.execute(insert(model), rows[kind])
+            counts[kind] = len(rows[kind])
+        await rebuild_counters(conn)
+    await engine.dispose()
+    return counts
+
+
+def client(url: str, usernames: list, args, started_at: float, results):
+    """One client process running a swipe session per user; reports (endpoint, ms, statements, ok) samples"""
+    import httpx
+
+    async def run():
+        samples = []
+        rng = random.Random(f"{args.seed}-{usernames[0] if usernames else ''}")
+        measure_from = started_at + args.warmup
+        deadline = measure_from + args.seconds
+
+        async def call(http, endpoint: str, method: str, path: str, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = await http.request(method, path, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                response, ok = None, False
+            if time.time() >= measure_from:
+                match = STATEMENTS.search(response.headers.get("server-timing", "")) if response is not None else None
+                samples.append((endpoint, (time.perf_counter() - start) * 1000, int(match.group(1)) if match else None, ok))
+            return response.json() if ok else None
+
+        async def swipe(username: str):
+            async with httpx.AsyncClient(base_url=url, timeout=60) as http:
+                await call(http, "/api/login", "POST", "/api/login", json={"username": username})
+                swipes = args.session_swipes
+                while time.time() < deadline:
+                    if swipes >= args.session_swipes:
+                        # The app is opened again: a new feed session without a cursor
+                        await call(http, "/api/me", "GET", "/api/me")
+                        body = await call(http, "/api/feed", "GET", "/api/feed") or {}
+                        cursor, queue, swipes = body.get("cursor", ""), list(body.get("items", [])), 0
+                    if len(queue) < 2:
+                        body = await call(http, "/api/feed/more", "GET", "/api/feed/more", params={"cursor": cursor}) or {}
+                        cursor = body.get("cursor", cursor)
+                        queue += body.get("items", [])
+                        if not queue:
+                            await asyncio.sleep(0.1)
+                            continue
+                    content_id = queue.pop(0)["content_id"]
+                    swipes += 1
+                    await call(http, "/api/track_view", "POST", "/api/track_view",
+                               json={"content_id": content_id, "view_duration": rng.uniform(0.5, 15)})
+                    if rng.random() < args.like_rate:
+                        await call(http, "/api/toggle_like", "POST", "/api/toggle_like", json={"content_id": content_id})
+                    if rng.random() < args.comment_rate:
+                        await call(http, "/api/comments/{content_id}", "GET", f"/api/comments/{content_id}")
+                        await call(http, "/api/comments", "POST", "/api/comments",
+                                   json={"content_id": content_id, "text": f"Comment from {username}"})
+                    if args.think:
+                        await asyncio.sleep(rng.uniform(0, 2 * args.think))
+
+        await asyncio.gather(*(swipe(username) for username in usernames))
+        results.put(samples)
+
+    asyncio.run(run())
+
+
+def summarize(samples: list, seconds: float) -> dict:
+    endpoints = {}
+    for endpoint in sorted({sample[0] for sample in samples}) + ["all"]:
+        selected = [sample for sample in samples if endpoint in ("all", sample[0])]
+        latencies = [ms for _, ms, _, ok in selected if ok]
+        statements = [count for _, _, count, ok in selected if ok and count is not None]
+        endpoints[endpoint] = {
+            "requests": len(selected),
+            "errors": sum(1 for sample in selected if not sample[3]),
+            "throughput_rps": round(len(latencies) / seconds, 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+            "p50_ms": round(percentile(latencies, 0.5), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "queries_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+        }
+    return endpoints
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(result: dict, baseline: dict = None):
+    columns = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request"]
+    print(f"{'endpoint':<28}{'reqs':>7}{'err':>5}" + "".join(f"{column.replace('_per_request', '/req'):>18}"
+                                                          for column in columns))
+    for endpoint, stats in result["endpoints"].items():
+        before = (baseline or {}).get("endpoints", {}).get(endpoint, {})
+        cells = []
+        for column in columns:
+            value = stats[column]
+            cell = "-" if value is None else f"{value:.1f}"
+            if before.get(column) and value is not None:
+                cell += f" ({(value - before[column]) / before[column] * 100:+.0f}%)"
+            cells.append(f"{cell:>18}")
+        print(f"{endpoint:<28}{stats['requests']:>7}{stats['errors']:>5}" + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200, help="seeded users")
+    parser.add_argument("--articles", type=int, default=5000, help="seeded articles")
+    parser.add_argument("--interactions", type=int, default=50000, help="seeded views, likes and comments")
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent swipe sessions, one user each")
+    parser.add_argument("--clients", type=int, default=2, help="client processes the sessions are spread over")
+    parser.add_argument("--seconds", type=float, default=30, help="measured duration")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--session-swipes", type=int, default=25, help="articles swiped per app session")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds between swipes, 0 for closed-loop load")
+    parser.add_argument("--like-rate", type=float, default=0.15)
+    parser.add_argument("--comment-rate", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the fake Wikipedia takes per request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="results file, default bench_results/<commit>.json")
+    parser.add_argument("--compare", help="earlier results file to print the change against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    database_url = f"sqlite+aiosqlite:///{workdir}/suite.db"
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, ROOT_DIR)
+    from fake_wiki import FakeWiki
+
+    seed_started = time.perf_counter()
+    seeded = asyncio.run(seed(args))
+    print(f"seeded {seeded} in {time.perf_counter() - seed_started:.1f}s")
+
+    fake = FakeWiki(latency=args.latency).start()
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATABASE_URL=database_url, BENCH_WIKI_URL=fake.url, WEB_CONCURRENCY=str(args.workers),
+               SHARED_CACHE_URL="memory://" if args.workers > 1 else "", METRICS_SERVER_TIMING="1",
+               SLOW_REQUEST_MS="0", LEADER_LOCK_FILE=os.path.join(workdir, "leader.lock"))
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "bench_workers:app", "--app-dir", DEV_DIR,
+         "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env, start_new_session=True
+    )
+    try:
+        wait_ready(url, server)
+        results = multiprocessing.Queue()
+        usernames = [f"user{i % args.users}" for i in range(args.sessions)]
+        started_at = time.time()
+        clients = [
+            multiprocessing.Process(target=client, args=(url, usernames[i::args.clients], args, started_at, results))
+            for i in range(args.clients)
+        ]
+        for process in clients:
+            process.start()
+        samples = []
+        for _ in clients:
+            samples += results.get()
+        for process in clients:
+            process.join()
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+        fake.stop()
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "seeded": seeded,
+        "wikipedia_requests": fake.requests,
+        "endpoints": summarize(samples, args.seconds),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"compared with {baseline.get('commit')} ({args.compare})")
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(ROOT_DIR, "bench_results", f"{result['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Wikipedia requests and wall time to cache 50 articles, one page at a time vs batched.
+
+Caches random articles and articles for a list of interest titles into a
+throwaway SQLite database from the local fake Wikipedia, which counts the
+requests it answers. `--mode single` goes through the wikipedia library one
+page and one lazy property at a time (WIKI_BATCH_ENABLED=0); `--mode batch`
+uses multi-page MediaWiki queries. Without --mode both run, each in a fresh
+process. The prefetcher rows are the batched refill path.
+
+    python dev/bench_wiki_batch.py --articles 50 --latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def run(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    os.environ["WIKI_BATCH_ENABLED"] = "1" if args.mode == "batch" else "0"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/batch.db"
+
+    import wikipedia.wikipedia
+    from fake_wiki import FakeWiki
+    from database import engine, Base, AsyncSessionLocal
+    from services.wiki_service import get_or_create_wiki_content, cache_wiki_contents
+
+    fake = FakeWiki(latency=args.latency).start()
+    wikipedia.wikipedia.API_URL = fake.url
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    titles = [f"Interest {i}" for i in range(args.articles)]
+    runs = [
+        # What feed requests and, before batching, the prefetcher do
+        ("random, one at a time", lambda db: [get_or_create_wiki_content(db) for _ in range(args.articles)]),
+        ("titles, one at a time", lambda db: [get_or_create_wiki_content(db, f"{t} a") for t in titles]),
+    ]
+    if args.mode == "batch":
+        runs += [
+            ("random, prefetcher", lambda db: [cache_wiki_contents(db, random_count=args.articles)]),
+            ("titles, prefetcher", lambda db: [cache_wiki_contents(db, [f"{t} b" for t in titles])]),
+        ]
+    for name, fetch in runs:
+        requests_before = fake.requests
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            for call in fetch(db):
+                await call
+        elapsed = time.perf_counter() - start
+        print(f"{args.mode:<6} {name:<22} requests {fake.requests - requests_before:4d}  "
+              f"wall {elapsed:6.2f}s  per article {elapsed / args.articles * 1000:6.1f}ms")
+    fake.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["single", "batch"])
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds the fake Wikipedia takes per request")
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(run(args))
+    else:
+        for mode in ("single", "batch"):
+            subprocess.run([sys.executable, "-W", "ignore", __file__, "--mode", mode] + sys.argv[1:], check=True)
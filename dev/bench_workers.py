@@ -0,0 +1,194 @@
+"""/api/feed/more throughput with 1, 2 and 4 uvicorn worker processes.
+
+Seeds a throwaway SQLite database with tagged articles and users who already
+have interests, starts a local fake Wikipedia, then for each worker count runs
+`uvicorn --workers N` against them and has several client processes page
+through feeds as fast as the server answers. Multi-worker runs use
+--shared-cache, which defaults to memory:// and so keeps caches per worker; pass
+redis://localhost:6379/0 (make redis-up) to share payloads and seen-sets.
+
+    python dev/bench_workers.py --workers 1 2 4 --clients 4 --seconds 15
+
+Scaling needs as many free cores as workers plus clients; on a small machine the
+numbers mostly show the coordination overhead.
+
+When imported by uvicorn (`bench_workers:app`) this module points the wikipedia
+library at BENCH_WIKI_URL and serves main.app.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+DEV_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(DEV_DIR, "..")
+
+
+def percentile(samples: list, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def seed(args):
+    from database import engine, Base, AsyncSessionLocal
+    from models import User, WikiContent, ContentTag, UserInterest
+    from migrations import run_migrations
+    from services.interest_decay import ensure_anchor, stored_score
+
+    tags = [f"Topic {i}" for i in range(args.tags)]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+        # Scores are stored scaled to the decay epoch; anchored now, startup leaves them as they are
+        await ensure_anchor(conn)
+    async with AsyncSessionLocal() as db:
+        for i in range(args.articles):
+            article_tags = random.sample(tags, 5)
+            content_id = f"{i:016x}"
+            db.add(WikiContent(content_id=content_id, title=f"Article {i}", summary="Seeded article. " * 20,
+                               related_links="[]", categories=json.dumps(article_tags)))
+            db.add_all(ContentTag(content_id=content_id, tag=tag) for tag in article_tags)
+        db.add_all(User(username=f"user{i}") for i in range(args.users))
+        await db.flush()
+        for i in range(args.users):
+            db.add_all(UserInterest(user_id=i + 1, category_or_tag=tag, score=stored_score(random.uniform(1, 10)))
+                       for tag in random.sample(tags, 20))
+        await db.commit()
+    await engine.dispose()
+
+
+def client(url: str, usernames: list, seconds: float, results):
+    """One client process: a swipe loop per user, reports (latencies in ms, errors, pids served by)"""
+    import httpx
+
+    async def run():
+        latencies, errors, pids = [], 0, set()
+        deadline = time.monotonic() + seconds
+
+        async def swipe(username: str):
+            nonlocal errors
+            cursor = ""
+            async with httpx.AsyncClient(base_url=url, cookies={"username": username}, timeout=30) as http:
+                while time.monotonic() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        response = await http.get("/api/feed/more", params={"cursor": cursor})
+                        response.raise_for_status()
+                    except Exception:
+                        errors += 1
+                        continue
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    body = response.json()
+                    cursor = body.get("cursor", cursor)
+                    for item in body["items"]:
+                        await http.post("/api/track_view", json={"content_id": item["content_id"], "view_duration": 3})
+                    pids.add((await http.get("/api/stats")).json()["worker"]["pid"])
+
+        await asyncio.gather(*(swipe(username) for username in usernames))
+        results.put((latencies, errors, sorted(pids)))
+
+    asyncio.run(run())
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 120):
+    import httpx
+    give_up_at = time.monotonic() + timeout
+    while time.monotonic() < give_up_at:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"{url}/api/stats", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("uvicorn did not come up")
+
+
+def bench(args, workers: int, database_url: str, wiki_url: str, workdir: str):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATABASE_URL=database_url, BENCH_WIKI_URL=wiki_url, WEB_CONCURRENCY=str(workers),
+               SHARED_CACHE_URL=args.shared_cache if workers > 1 else "",
+               LEADER_LOCK_FILE=os.path.join(workdir, f"leader-{workers}.lock"))
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "bench_workers:app", "--app-dir", DEV_DIR,
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env, start_new_session=True
+    )
+    try:
+        wait_ready(url, server)
+        results = multiprocessing.Queue()
+        usernames = [f"user{i}" for i in range(args.users)]
+        clients = [
+            multiprocessing.Process(target=client, args=(url, usernames[i::args.clients], args.seconds, results))
+            for i in range(args.clients)
+        ]
+        for process in clients:
+            process.start()
+        latencies, errors, pids = [], 0, set()
+        for _ in clients:
+            client_latencies, client_errors, client_pids = results.get()
+            latencies += client_latencies
+            errors += client_errors
+            pids.update(client_pids)
+        for process in clients:
+            process.join()
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    print(f"workers {workers}  pages {len(latencies):6d}  {len(latencies) / args.seconds:7.1f} pages/s  "
+          f"p50={percentile(latencies, 0.5):7.1f}ms  p99={percentile(latencies, 0.99):7.1f}ms  "
+          f"errors {errors}  answered by {len(pids)} pids")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--shared-cache", default="memory://",
+                        help="SHARED_CACHE_URL for multi-worker runs; memory:// keeps caches per worker")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    database_url = f"sqlite+aiosqlite:///{workdir}/workers.db"
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, DEV_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    from fake_wiki import FakeWiki
+
+    asyncio.run(seed(args))
+    fake = FakeWiki(latency=0.05).start()
+    try:
+        for workers in args.workers:
+            bench(args, workers, database_url, fake.url, workdir)
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
+elif os.getenv("BENCH_WIKI_URL"):
+    sys.path.insert(0, ROOT_DIR)
+    import wikipedia.wikipedia
+    wikipedia.wikipedia.API_URL = os.environ["BENCH_WIKI_URL"]
+    from main import app  # noqa: F401
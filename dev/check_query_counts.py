@@ -0,0 +1,115 @@
+"""Check that a feed page costs the same number of SQL statements however many items it returns.
+
+Builds a scratch SQLite database through create_all plus the migrations, seeds
+one user with interests, likes and comments on a handful of tagged articles,
+and calls /api/feed, /api/feed/more and /api/load_more in process. Each route
+is called once excluding all but one article and once with five to choose
+from; statements are counted with an engine event. Exits non-zero if a route
+returns the wrong number of items or its two counts differ, i.e. some work
+runs once per item instead of once per page.
+
+The app runs without its lifespan: no prefetcher, feed queues or event queue,
+and the feeds are served from the cache as in a follower worker, so nothing
+calls Wikipedia and no background task adds statements.
+
+    python dev/check_query_counts.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+ARTICLES = 8
+ROUTES = ("/api/feed", "/api/feed/more", "/api/load_more")
+PAGE_SIZES = (1, 5)
+
+
+async def main() -> int:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/counts.db"
+    os.environ.setdefault("LEADER_LOCK_FILE", os.path.join(tempfile.mkdtemp(), "leader.lock"))
+    os.environ["FEED_QUEUE_ENABLED"] = "0"
+
+    import httpx
+    from sqlalchemy import event
+    from database import engine, read_engine, Base, AsyncSessionLocal
+    from migrations import run_migrations
+    from models import User, WikiContent, ContentTag, UserInterest, Like, Comment
+    from services.counter_service import rebuild_counters
+    from services.interest_decay import ensure_anchor, load_anchor, stored_score
+    from services.sampling_service import content_index
+    from services.ranking_service import ranking_engine
+    from services.tag_index import tag_index
+    from services.prefetch_service import prefetcher
+    from services.payload_cache import payload_cache
+    import main as app_module
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+        await ensure_anchor(conn)
+
+    ids = [f"{i:016x}" for i in range(ARTICLES)]
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=1, username="alice"))
+        for i, content_id in enumerate(ids):
+            tags = ["Physics", f"Tag {i}"]
+            db.add(WikiContent(content_id=content_id, title=f"Article {i}", summary=f"Article {i}.",
+                               related_links=json.dumps([]), categories=json.dumps(tags)))
+            db.add_all(ContentTag(content_id=content_id, tag=tag) for tag in tags)
+        db.add(UserInterest(user_id=1, category_or_tag="Physics", score=stored_score(10.0)))
+        db.add_all(Like(user_id=1, content_id=content_id) for content_id in ids[::2])
+        db.add_all(Comment(user_id=1, content_id=content_id, text="hi") for content_id in ids[::3])
+        await db.commit()
+    async with engine.begin() as conn:
+        await rebuild_counters(conn)
+
+    # What main.lifespan loads before serving; the pool counts as kept by another worker
+    async with AsyncSessionLocal() as db:
+        await load_anchor(db)
+        await content_index.ensure_loaded(db)
+        await ranking_engine.ensure_loaded(db)
+        await tag_index.ensure_loaded(db)
+    prefetcher.enabled = True
+
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = {engine.sync_engine, read_engine.sync_engine}
+    for sync_engine in engines:
+        event.listen(sync_engine, "before_cursor_execute", _count)
+
+    failures = 0
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/api/login", json={"username": "alice"})
+        for route in ROUTES:
+            counts = {}
+            for size in PAGE_SIZES:
+                # A fresh session and a cold payload cache, so both pages do the same lookups
+                payload_cache.invalidate()
+                statements.clear()
+                response = await client.get(route, params={"exclude": ",".join(ids[size:])})
+                items = response.json().get("items", [])
+                counts[size] = len(statements)
+                ok = response.status_code == 200 and len(items) == size
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {route} {len(items)}/{size} items: {counts[size]} statements")
+            ok = len(set(counts.values())) == 1
+            failures += not ok
+            if not ok:
+                print(f"FAIL {route}: statements per page depend on the number of items {counts}")
+
+    for sync_engine in engines:
+        event.remove(sync_engine, "before_cursor_execute", _count)
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
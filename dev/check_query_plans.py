@@ -0,0 +1,70 @@
+"""Check that the hot-path queries are served by an index.
+
+Builds a scratch SQLite database through create_all plus the migrations, runs
+EXPLAIN QUERY PLAN for each query the feed, like and comment routes issue, and
+exits non-zero if any of them scans a table or sorts through a temp b-tree.
+
+    python dev/check_query_plans.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+
+async def main() -> int:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/plans.db"
+
+    from sqlalchemy import select, text, and_
+    from database import engine, Base
+    from migrations import run_migrations
+    from models import User, WikiContent, ContentTag, UserInterest, View, Comment, Like
+
+    ids = ["0000000000000001", "0000000000000002"]
+    queries = {
+        "user by username": select(User).filter(User.username == "alice"),
+        "like by user and content": select(Like).filter(Like.user_id == 1, Like.content_id == ids[0]),
+        "likes for feed items": select(Like.content_id).filter(Like.user_id == 1, Like.content_id.in_(ids)),
+        "content by ids": select(WikiContent).filter(WikiContent.content_id.in_(ids)),
+        "tags for interactions": (
+            select(WikiContent.content_id, ContentTag.tag)
+            .outerjoin(ContentTag, ContentTag.content_id == WikiContent.content_id)
+            .where(WikiContent.content_id.in_(ids))
+        ),
+        "articles by tag": select(ContentTag.content_id).filter(ContentTag.tag == "Physics"),
+        "top interests": (
+            select(UserInterest).filter(UserInterest.user_id == 1)
+            .order_by(UserInterest.score.desc()).limit(20)
+        ),
+        "recent views": select(View.content_id).filter(View.user_id == 1).order_by(View.id.desc()).limit(2000),
+        "comments by content": select(Comment).filter(Comment.content_id == ids[0]),
+        "comment thread page": (
+            select(WikiContent.title, Comment.id, Comment.text, User.username)
+            .outerjoin(Comment, and_(Comment.content_id == WikiContent.content_id, Comment.id > 100))
+            .outerjoin(User, User.id == Comment.user_id)
+            .where(WikiContent.content_id == ids[0])
+            .order_by(Comment.id).limit(21)
+        ),
+        "comments by user": select(Comment.id).filter(Comment.user_id == 1),
+    }
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+
+    failures = 0
+    async with engine.connect() as conn:
+        for name, query in queries.items():
+            compiled = query.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+            result = await conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+            plan = [row[-1] for row in result]
+            ok = not any(step.startswith("SCAN") or "TEMP B-TREE" in step for step in plan)
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {' | '.join(plan)}")
+    await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
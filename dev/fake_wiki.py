@@ -0,0 +1,152 @@
+"""Local stand-in for the MediaWiki query API, used by the dev benchmarks.
+
+Serves deterministic fake articles for the query shapes the `wikipedia` library
+and services.wiki_fetcher send, with optional injected latency and a request
+counter. Links are paged under one pllimit budget per request with MediaWiki's
+continue/batchcomplete fields. As in the real API, a random generator batch
+hands out a grncontinue: while its links are incomplete it names the batch,
+held with "continue": "grncontinue||" so sending it back regenerates the same
+pages, and after batchcomplete it points at a fresh batch.
+
+    python dev/fake_wiki.py --port 8765 --latency 0.5
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeWiki:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 links_per_page: int = 40, link_budget: int = 500):
+        self.latency = latency
+        self.links_per_page = links_per_page
+        self.link_budget = link_budget
+        self.requests = 0
+        # grncontinue -> the titles the random generator produced there
+        self._random_batches = {}
+        self._lock = threading.Lock()
+        self._random_ids = itertools.count(1)
+        self._generator_positions = itertools.count(1)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query, keep_blank_values=True).items()}
+                body = json.dumps(fake.handle(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}/w/api.php"
+
+    def start(self) -> "FakeWiki":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def random_titles(self, n: int) -> list:
+        with self._lock:
+            return [f"Fake article {next(self._random_ids)}" for _ in range(n)]
+
+    def handle(self, params: dict) -> dict:
+        if params.get("list") == "random":
+            titles = self.random_titles(int(params.get("rnlimit", 1)))
+            return {"query": {"random": [{"id": abs(hash(t)), "ns": 0, "title": t} for t in titles]}}
+
+        continuing = "plcontinue" in params
+        position = None
+        if params.get("generator") == "random":
+            # A known position regenerates its batch, anything else draws new pages there
+            position = params.get("grncontinue") or self._next_position()
+            with self._lock:
+                titles = self._random_batches.get(position)
+            if titles is None:
+                titles = self.random_titles(int(params.get("grnlimit", 1)))
+                with self._lock:
+                    self._random_batches[position] = titles
+        else:
+            titles = [t for t in params.get("titles", "").split("|") if t]
+
+        if params.get("generator") == "images":
+            # One image per article
+            return {"query": {"pages": {"-1": {
+                "ns": 6, "title": f"File:{titles[0]}.jpg",
+                "imageinfo": [{"url": f"https://upload.example.org/{titles[0].replace(' ', '_')}.jpg"}]
+            }}}}
+
+        props = set(params.get("prop", "").split("|"))
+        pages = {}
+        links = []
+        for i, title in enumerate(titles):
+            if title.startswith("Missing"):
+                pages[str(-1 - i)] = {"ns": 0, "title": title, "missing": ""}
+                continue
+            page_id = str(abs(hash(title)) % 10 ** 8)
+            page = {"pageid": int(page_id), "ns": 0, "title": title}
+            slug = title.replace(" ", "_")
+            if not continuing:
+                if "info" in props:
+                    page["fullurl"] = f"https://en.wikipedia.org/wiki/{slug}"
+                if "extracts" in props:
+                    page["extract"] = f"{title} is a fake article served for benchmarking. " * 8
+                if "pageimages" in props:
+                    page["original"] = {"source": f"https://upload.example.org/{slug}.jpg"}
+                if "categories" in props:
+                    page["categories"] = [{"ns": 14, "title": f"Category:Fake topic {n}"} for n in range(3)]
+            if "links" in props:
+                # Every fourth article is a stub with a handful of links
+                count = 3 if zlib.crc32(title.encode()) % 4 == 0 else self.links_per_page
+                links += [(page_id, f"{title} link {n}") for n in range(count)]
+            pages[page_id] = page
+
+        response = {"query": {"pages": pages}}
+        # Like MediaWiki, all pages of a request share one pllimit budget of links
+        start = int(params["plcontinue"]) if continuing else 0
+        limit = self.link_budget if params.get("pllimit", "max") == "max" else int(params["pllimit"])
+        for page_id, link in links[start:start + limit]:
+            pages[page_id].setdefault("links", []).append({"ns": 0, "title": link})
+        if start + limit < len(links):
+            response["continue"] = {"plcontinue": str(start + limit), "continue": "||"}
+            if position is not None:
+                # Hold the generator: the same position brings back the same pages
+                response["continue"].update({"grncontinue": position, "continue": "grncontinue||"})
+        else:
+            response["batchcomplete"] = ""
+            if position is not None:
+                # The random generator can always go on, to new pages
+                response["continue"] = {"grncontinue": self._next_position(), "continue": "-||"}
+        return response
+
+    def _next_position(self) -> str:
+        with self._lock:
+            n = next(self._generator_positions)
+        return f"0.{n:08d}|0.{n:08d}|{n}|0"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeWiki(port=args.port, latency=args.latency)
+    print(f"Fake Wikipedia API on {fake.url}")
+    fake.server.serve_forever()
@@ -3,22 +3,86 @@ from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from database import engine, Base
-from routers import auth, feed, interactions, tracking, profile
+from database import engine, read_engine, Base, AsyncSessionLocal
+from migrations import run_migrations
+from routers import auth, feed, interactions, tracking, profile, stats, metrics
+from services.prefetch_service import prefetcher
+from services.sampling_service import content_index
+from services.ranking_service import ranking_engine
+from services.tag_index import tag_index
+from services.feed_queue import feed_queues
+from services.event_queue import event_queue
+from services.payload_cache import access_tracker
+from services.interest_decay import interest_compactor, ensure_anchor, load_anchor, check_anchor
+from services.content_sync import content_sync
+from services.leader import leader, file_lock
+from services.shared_store import shared_store
+from services.metrics import MetricsMiddleware, instrument_engine
+from config import (
+    PREFETCH_ENABLED, EVENT_QUEUE_ENABLED, FEED_QUEUE_ENABLED, MIGRATE_ON_STARTUP, WORKERS, LEADER_LOCK_FILE,
+    METRICS_ENABLED
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create database tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Startup: Create database tables and migrate existing ones
+    if MIGRATE_ON_STARTUP:
+        # Workers start together, the first one migrates and the others find nothing to do
+        with file_lock(LEADER_LOCK_FILE + ".migrate"):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await run_migrations(conn)
+                # Rescale stored interest scores if the half-life changed or the epoch grew old
+                await ensure_anchor(conn)
+    # Load the content id index used for random feed sampling
+    async with AsyncSessionLocal() as db:
+        # Without MIGRATE_ON_STARTUP a changed half-life waits for `python migrations.py upgrade`
+        check_anchor(await load_anchor(db))
+        await content_index.ensure_loaded(db)
+        # Tag matrix for ranking cached articles against user interests (no-op without numpy/scipy)
+        await ranking_engine.ensure_loaded(db)
+        # Tag -> article index so interest slots are served from the cache first
+        await tag_index.ensure_loaded(db)
+    # Keep a warm pool of articles so feed requests never wait on Wikipedia; with
+    # several workers only the elected leader runs the prefetcher
+    if PREFETCH_ENABLED:
+        prefetcher.enabled = True
+        leader.register(prefetcher.start, prefetcher.stop)
+    # Batch view/share/like writes instead of committing per request
+    if EVENT_QUEUE_ENABLED:
+        event_queue.start()
+    access_tracker.start()
+    # Ready-made feed pages per active user
+    if FEED_QUEUE_ENABLED:
+        feed_queues.start()
+    # Prune interests that have decayed to nothing (leader only)
+    leader.register(interest_compactor.start, interest_compactor.stop)
+    leader.start()
+    # Pick up articles other workers cached into this worker's indexes
+    if WORKERS > 1:
+        content_sync.start()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop background workers and drain pending writes
+    await feed_queues.stop()
+    await leader.stop()
+    await content_sync.stop()
+    await event_queue.stop()
+    await access_tracker.stop()
+    if shared_store is not None:
+        await shared_store.close()
 
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(lifespan=lifespan)
 
+# Per-route latency, status and SQL statement counts, served on /metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    if read_engine is not engine:
+        instrument_engine(read_engine)
+
 templates = Jinja2Templates(directory="templates")
 
 # Mount static files
@@ -30,6 +94,8 @@ app.include_router(feed.router)
 app.include_router(interactions.router)
 app.include_router(tracking.router)
 app.include_router(profile.router)
+app.include_router(stats.router)
+app.include_router(metrics.router)
 
 
 # SPA route - serve the app for all non-API routes
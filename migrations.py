@@ -0,0 +1,191 @@
+"""Versioned schema migrations, run at startup or from the command line:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py status     # show applied and pending versions
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import text, inspect
+from sqlalchemy.ext.asyncio import AsyncConnection
+from models import Like, Comment, View, UserInterest, WikiContent, InterestDecayAnchor
+from services.counter_service import rebuild_counters
+from services.interest_decay import stored_score, ensure_anchor, DEFAULT_EPOCH
+from config import INTEREST_HALF_LIFE_DAYS
+from services.wiki_service import item_tags
+
+# (version, description, coroutine) in the order they must run
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+async def _columns(conn: AsyncConnection, table: str) -> set:
+    columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns(table))
+    return {column['name'] for column in columns}
+
+
+async def _add_column(conn: AsyncConnection, table: str, ddl: str):
+    if ddl.split()[0] not in await _columns(conn, table):
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}"))
+
+
+async def _create_index(conn: AsyncConnection, index):
+    await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    await conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    result = await conn.execute(text("SELECT MAX(version) FROM schema_version"))
+    return result.scalar() or 0
+
+
+async def run_migrations(conn: AsyncConnection):
+    """Bring an existing database up to date. Runs after create_all, so every step must be idempotent."""
+    current = await current_version(conn)
+
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        print(f"Applying migration {version}: {description}")
+        await fn(conn)
+        await conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+
+
+@migration(1, "like and comment counters")
+async def _counter_columns(conn: AsyncConnection):
+    for table in ("wiki_content", "users"):
+        await _add_column(conn, table, "like_count INTEGER DEFAULT 0")
+        await _add_column(conn, table, "comment_count INTEGER DEFAULT 0")
+    await rebuild_counters(conn)
+
+
+@migration(2, "merge duplicate user interests and add unique (user_id, category_or_tag) index")
+async def _unique_user_interests(conn: AsyncConnection):
+    await conn.execute(text("""
+        UPDATE user_interests SET
+            score = (SELECT SUM(d.score) FROM user_interests d
+                     WHERE d.user_id = user_interests.user_id AND d.category_or_tag = user_interests.category_or_tag),
+            last_updated = (SELECT MAX(d.last_updated) FROM user_interests d
+                            WHERE d.user_id = user_interests.user_id AND d.category_or_tag = user_interests.category_or_tag)
+        WHERE id IN (SELECT MIN(id) FROM user_interests GROUP BY user_id, category_or_tag HAVING COUNT(*) > 1)
+    """))
+    await conn.execute(text("""
+        DELETE FROM user_interests
+        WHERE id NOT IN (SELECT MIN(id) FROM user_interests GROUP BY user_id, category_or_tag)
+    """))
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_interests_user_tag ON user_interests (user_id, category_or_tag)"
+    ))
+
+
+@migration(3, "indexes for likes(user_id, content_id), comments(user_id), views(user_id), user_interests(user_id, score)")
+async def _hot_path_indexes(conn: AsyncConnection):
+    for index in (
+        *Like.__table__.indexes,
+        *Comment.__table__.indexes,
+        *View.__table__.indexes,
+        *UserInterest.__table__.indexes,
+    ):
+        await _create_index(conn, index)
+
+
+@migration(4, "rescale interest scores to the decay epoch")
+async def _decayed_interest_scores(conn: AsyncConnection):
+    # Existing scores never decayed, treat them as live at their last update
+    now = datetime.now(timezone.utc)
+    result = await conn.execute(text("SELECT id, score, last_updated FROM user_interests"))
+    rows = [
+        {"id": id, "score": stored_score(score or 0.0, _as_datetime(last_updated) or now)}
+        for id, score, last_updated in result.all()
+    ]
+    if rows:
+        await conn.execute(text("UPDATE user_interests SET score = :score WHERE id = :id"), rows)
+
+
+def _as_datetime(value):
+    # Raw SQLite rows carry timestamps as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+@migration(5, "backfill content_tags from the wiki_content JSON columns")
+async def _backfill_content_tags(conn: AsyncConnection):
+    result = await conn.execute(text("""
+        SELECT content_id, categories, related_links FROM wiki_content
+        WHERE content_id NOT IN (SELECT content_id FROM content_tags)
+    """))
+    rows = [
+        {"content_id": content_id, "tag": tag}
+        for content_id, categories, related_links in result.all()
+        for tag in dict.fromkeys(item_tags({
+            'categories': json.loads(categories) if categories else [],
+            'related': json.loads(related_links) if related_links else []
+        }))
+    ]
+    if rows:
+        await conn.execute(text("INSERT INTO content_tags (content_id, tag) VALUES (:content_id, :tag)"), rows)
+
+
+@migration(6, "index wiki_content(created_at)")
+async def _content_created_index(conn: AsyncConnection):
+    for index in WikiContent.__table__.indexes:
+        await _create_index(conn, index)
+
+
+@migration(7, "index comments(content_id, id) for paged threads")
+async def _comment_thread_index(conn: AsyncConnection):
+    for index in Comment.__table__.indexes:
+        await _create_index(conn, index)
+
+
+@migration(8, "store the interest decay epoch and half-life")
+async def _interest_decay_anchor(conn: AsyncConnection):
+    await conn.run_sync(lambda sync_conn: InterestDecayAnchor.__table__.create(sync_conn, checkfirst=True))
+    # Scores so far were scaled to the fixed epoch with the half-life configured now
+    if (await conn.execute(text("SELECT COUNT(*) FROM interest_decay"))).scalar() == 0:
+        await conn.execute(InterestDecayAnchor.__table__.insert().values(
+            id=1, epoch=DEFAULT_EPOCH, half_life_days=INTEREST_HALF_LIFE_DAYS, version=1
+        ))
+
+
+@migration(9, "merge duplicate likes and make likes(user_id, content_id) unique")
+async def _unique_likes(conn: AsyncConnection):
+    await conn.execute(text("""
+        DELETE FROM likes
+        WHERE id NOT IN (SELECT MIN(id) FROM likes GROUP BY user_id, content_id)
+    """))
+    # Same name as the plain index from migration 3, which create_all may also have made
+    await conn.execute(text("DROP INDEX IF EXISTS ix_likes_user_content"))
+    for index in Like.__table__.indexes:
+        await _create_index(conn, index)
+    await rebuild_counters(conn)
+
+
+async def _main(command: str):
+    from database import engine, Base
+
+    async with engine.begin() as conn:
+        if command == "status":
+            current = await current_version(conn)
+            for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+                state = "applied" if version <= current else "pending"
+                print(f"{version:>4}  {state:<8} {description}")
+        elif command == "upgrade":
+            await conn.run_sync(Base.metadata.create_all)
+            await run_migrations(conn)
+            # Rescale stored interest scores if the half-life changed or the epoch grew old
+            await ensure_anchor(conn)
+            print(f"Database at version {await current_version(conn)}")
+        else:
+            raise SystemExit(f"Unknown command {command!r}, expected 'upgrade' or 'status'")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, and_
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, Index, and_
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime, timezone
@@ -13,6 +13,9 @@ class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
+    # Maintained by the interaction handlers, rebuilt by services.counter_service
+    like_count = Column(Integer, default=0, server_default="0")
+    comment_count = Column(Integer, default=0, server_default="0")
 
 
 class WikiContent(Base):
@@ -24,27 +27,61 @@ class WikiContent(Base):
     image_url = Column(String, nullable=True)
     related_links = Column(Text)  # JSON array
     categories = Column(Text)  # JSON array
-    created_at = Column(DateTime, default_factory=utc_now)
-    last_accessed = Column(DateTime, default_factory=utc_now)
+    # Indexed for workers picking up articles cached by other workers
+    created_at = Column(DateTime(timezone=True), default=utc_now, index=True)
+    last_accessed = Column(DateTime(timezone=True), default=utc_now)
     access_count = Column(Integer, default=0)
+    # Maintained by the interaction handlers, rebuilt by services.counter_service
+    like_count = Column(Integer, default=0, server_default="0")
+    comment_count = Column(Integer, default=0, server_default="0")
+
+
+class ContentTag(Base):
+    """Interest tags of a cached article (wiki_service.item_tags), one row per tag"""
+    __tablename__ = "content_tags"
+    __table_args__ = (
+        # Tags of the articles an interaction touched: WHERE content_id IN (...)
+        Index("uq_content_tags_content_tag", "content_id", "tag", unique=True),
+        # Articles carrying a tag
+        Index("ix_content_tags_tag", "tag"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    content_id = Column(String, ForeignKey("wiki_content.content_id"))
+    tag = Column(String)
 
 
 class UserInterest(Base):
     __tablename__ = "user_interests"
+    __table_args__ = (
+        # One row per user and tag, target of the scoring upsert
+        Index("uq_user_interests_user_tag", "user_id", "category_or_tag", unique=True),
+        # Top interests per user: WHERE user_id = ? ORDER BY score DESC LIMIT n
+        Index("ix_user_interests_user_score", "user_id", "score"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     category_or_tag = Column(String)
     score = Column(Float, default=0.0)
-    last_updated = Column(DateTime, default_factory=utc_now)
+    last_updated = Column(DateTime(timezone=True), default=utc_now)
+
+
+class InterestDecayAnchor(Base):
+    """The single row of epoch and half-life that stored interest scores are scaled to (services.interest_decay)"""
+    __tablename__ = "interest_decay"
+    id = Column(Integer, primary_key=True)
+    epoch = Column(DateTime(timezone=True), nullable=False)
+    half_life_days = Column(Float, nullable=False)
+    # Bumped on every rescale; interest writers check it under the row lock
+    version = Column(Integer, nullable=False, default=1)
 
 
 class View(Base):
     __tablename__ = "views"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     content_id = Column(String, ForeignKey("wiki_content.content_id"), index=True)
     view_duration = Column(Float, default=0.0)
-    timestamp = Column(DateTime, default_factory=utc_now)
+    timestamp = Column(DateTime(timezone=True), default=utc_now)
 
 
 class Share(Base):
@@ -52,13 +89,17 @@ class Share(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     content_id = Column(String, ForeignKey("wiki_content.content_id"))
-    timestamp = Column(DateTime, default_factory=utc_now)
+    timestamp = Column(DateTime(timezone=True), default=utc_now)
 
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Threads are paged by id: WHERE content_id = ? AND id > ? ORDER BY id LIMIT ?
+        Index("ix_comments_content_id_id", "content_id", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     content_id = Column(String, ForeignKey("wiki_content.content_id"), index=True)
     text = Column(Text)
     user = relationship("User")
@@ -67,6 +108,11 @@ class Comment(Base):
 
 class Like(Base):
     __tablename__ = "likes"
+    __table_args__ = (
+        # is_liked lookups and toggle_like: WHERE user_id = ? AND content_id = ? / IN (...);
+        # unique so a double tap cannot insert the same like twice
+        Index("ix_likes_user_content", "user_id", "content_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     content_id = Column(String, ForeignKey("wiki_content.content_id"))
@@ -1,3 +1,4 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, Cookie
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -5,6 +6,7 @@ from sqlalchemy import select
 from pydantic import BaseModel
 from models import User
 from database import get_db
+from services.user_service import user_cache, current_user_id
 
 router = APIRouter()
 
@@ -22,6 +24,7 @@ async def login_action(data: LoginRequest, db: AsyncSession = Depends(get_db)):
         db.add(user)
         await db.commit()
         await db.refresh(user)
+    user_cache.put(user.username, user.id)
 
     response = JSONResponse({
         "success": True,
@@ -38,17 +41,12 @@ async def login_action(data: LoginRequest, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/api/me")
-async def get_current_user(username: str = Cookie(None), db: AsyncSession = Depends(get_db)):
-    if not username:
-        return JSONResponse({"user": None}, status_code=401)
-
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if not user:
+async def get_current_user(username: str = Cookie(None), user_id: Optional[int] = Depends(current_user_id)):
+    if user_id is None:
         return JSONResponse({"user": None}, status_code=401)
 
     return JSONResponse({
-        "user": {"id": user.id, "username": user.username}
+        "user": {"id": user_id, "username": username}
     })
 
 
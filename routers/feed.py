@@ -1,173 +1,115 @@
+from typing import Optional
 from fastapi import APIRouter, Cookie, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
-from models import User, Like, Comment, WikiContent
-from database import get_db
-from services.recommendation_service import get_personalized_feed
-from services.wiki_service import get_or_create_wiki_content
-import json
-import random
+from database import get_db, get_read_db
+from services.recommendation_service import get_personalized_feed, fetch_candidates
+from services.wiki_service import get_cached_feed_items
+from services.prefetch_service import prefetcher
+from services.wiki_fetcher import wiki_breaker
+from services.feed_service import enrich_feed_items
+from services.seen_service import seen_sessions, parse_exclude, SeenSet
+from services.feed_queue import feed_queues
+from services.user_service import current_user_id
 
 router = APIRouter()
 
 
-async def get_cached_feed_items(db: AsyncSession, count: int, exclude: set) -> list:
-    """Get random items from cache (DB), no Wikipedia API calls"""
-    # Get all cached content
-    result = await db.execute(select(WikiContent))
-    cached_items = result.scalars().all()
-
-    # Shuffle for randomness
-    random.shuffle(cached_items)
-
-    feed_items = []
-    for cached in cached_items:
-        if cached.content_id in exclude:
-            continue
-        if len(feed_items) >= count:
-            break
-
-        feed_items.append({
-            "content_id": cached.content_id,
-            "title": cached.title,
-            "summary": cached.summary[:200] + "..." if len(cached.summary) > 200 else cached.summary[:200],
-            "whole_summary": cached.summary,
-            "image": cached.image_url,
-            "related": json.loads(cached.related_links) if cached.related_links else [],
-            "categories": json.loads(cached.categories) if cached.categories else []
-        })
-
+async def next_feed_items(db: AsyncSession, user_id: int, count: int, exclude_ids: SeenSet) -> list:
+    """Enriched personalized items, from the user's ready queue first and computed for whatever it lacks"""
+    feed_items = feed_queues.pop(user_id, count, exclude_ids)
+    if len(feed_items) < count:
+        for item in feed_items:
+            exclude_ids.add(item['content_id'])
+        computed = await get_personalized_feed(db, user_id, count=count - len(feed_items), exclude=exclude_ids)
+        feed_items += await enrich_feed_items(db, user_id, computed)
     return feed_items
 
 
 @router.get("/api/feed")
 async def get_feed(
     exclude: str = "",
+    cursor: str = "",
     username: str = Cookie(None),
-    db: AsyncSession = Depends(get_db)
+    user_id: Optional[int] = Depends(current_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
     if not username:
         return JSONResponse({"error": "Not authenticated"}, status_code=401)
-
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if not user:
+    if user_id is None:
         return JSONResponse({"error": "User not found"}, status_code=401)
 
-    exclude_ids = set([t.strip() for t in exclude.split(',') if t.strip()]) if exclude else set()
+    # Server-side seen-set for this session, plus the legacy exclude list if sent
+    cursor, seen = await seen_sessions.resolve(db, user_id, cursor)
+    exclude_ids = SeenSet(seen, parse_exclude(exclude))
 
     # Only get 5 cached items - FAST response, no Wikipedia API calls
     feed_items = await get_cached_feed_items(db, count=5, exclude=exclude_ids)
 
-    for item in feed_items:
-        result = await db.execute(
-            select(Like).filter(
-                and_(Like.user_id == user.id, Like.content_id == item['content_id'])
-            )
-        )
-        is_liked = result.scalars().first() is not None
-
-        result = await db.execute(
-            select(func.count(Comment.id)).filter(Comment.content_id == item['content_id'])
-        )
-        comment_count = result.scalar() or 0
-
-        item['is_liked'] = is_liked
-        item['comment_count'] = comment_count
+    await enrich_feed_items(db, user_id, feed_items)
+    await seen_sessions.mark_served(cursor, user_id, seen, feed_items)
 
     return JSONResponse({
-        "items": feed_items
+        "items": feed_items,
+        "cursor": cursor
     })
 
 
 @router.get("/api/feed/more")
 async def get_feed_more(
     exclude: str = "",
-    username: str = Cookie(None),
+    cursor: str = "",
+    user_id: Optional[int] = Depends(current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Get additional personalized items (may call Wikipedia API)"""
-    if not username:
+    if user_id is None:
         return JSONResponse({"items": []})
 
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if not user:
-        return JSONResponse({"items": []})
-
-    exclude_ids = set([t.strip() for t in exclude.split(',') if t.strip()]) if exclude else set()
+    # Server-side seen-set for this session, plus the legacy exclude list if sent
+    cursor, seen = await seen_sessions.resolve(db, user_id, cursor)
+    exclude_ids = SeenSet(seen, parse_exclude(exclude))
 
     # Get 5 personalized items (may call Wikipedia API - slower)
-    feed_items = await get_personalized_feed(db, user.id, count=5, exclude=exclude_ids)
+    feed_items = await next_feed_items(db, user_id, 5, exclude_ids)
 
     if not feed_items:
-        return JSONResponse({"items": []})
+        return JSONResponse({"items": [], "cursor": cursor})
 
-    for item in feed_items:
-        result = await db.execute(
-            select(Like).filter(
-                and_(Like.user_id == user.id, Like.content_id == item['content_id'])
-            )
-        )
-        is_liked = result.scalars().first() is not None
-
-        result = await db.execute(
-            select(func.count(Comment.id)).filter(Comment.content_id == item['content_id'])
-        )
-        comment_count = result.scalar() or 0
-
-        item['is_liked'] = is_liked
-        item['comment_count'] = comment_count
+    await seen_sessions.mark_served(cursor, user_id, seen, feed_items)
 
     return JSONResponse({
-        "items": feed_items
+        "items": feed_items,
+        "cursor": cursor
     })
 
 
 @router.get("/api/load_more")
 async def load_more(
     exclude: str = "",
-    username: str = Cookie(None),
+    cursor: str = "",
+    user_id: Optional[int] = Depends(current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
-    if not username:
-        return JSONResponse({"items": []})
-
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if not user:
+    if user_id is None:
         return JSONResponse({"items": []})
 
-    exclude_ids = set([t.strip() for t in exclude.split(',') if t.strip()]) if exclude else set()
-    feed_items = await get_personalized_feed(db, user.id, count=5, exclude=exclude_ids)
+    # Server-side seen-set for this session, plus the legacy exclude list if sent
+    cursor, seen = await seen_sessions.resolve(db, user_id, cursor)
+    exclude_ids = SeenSet(seen, parse_exclude(exclude))
+    feed_items = await next_feed_items(db, user_id, 5, exclude_ids)
 
-    if not feed_items:
-        for _ in range(10):
-            item = await get_or_create_wiki_content(db)
-            if item and item['content_id'] not in exclude_ids:
-                feed_items.append(item)
-                break
+    # While a prefetcher (here or in the leader worker) refills the pool, or the breaker
+    # says Wikipedia is down, never wait on Wikipedia here
+    if not feed_items and not prefetcher.enabled and wiki_breaker.available:
+        feed_items = await enrich_feed_items(db, user_id, await fetch_candidates([], count=1, exclude=exclude_ids))
 
     if not feed_items:
-        return JSONResponse({"items": []})
-
-    for item in feed_items:
-        result = await db.execute(
-            select(Like).filter(
-                and_(Like.user_id == user.id, Like.content_id == item['content_id'])
-            )
-        )
-        is_liked = result.scalars().first() is not None
-
-        result = await db.execute(
-            select(func.count(Comment.id)).filter(Comment.content_id == item['content_id'])
-        )
-        comment_count = result.scalar() or 0
+        return JSONResponse({"items": [], "cursor": cursor})
 
-        item['is_liked'] = is_liked
-        item['comment_count'] = comment_count
+    await seen_sessions.mark_served(cursor, user_id, seen, feed_items)
 
     return JSONResponse({
-        "items": feed_items
+        "items": feed_items,
+        "cursor": cursor
     })
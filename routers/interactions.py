@@ -1,11 +1,19 @@
+from typing import Optional
 from fastapi import APIRouter, Cookie, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, delete, and_
 from pydantic import BaseModel
 from models import Like, Comment, WikiContent, User
-from database import get_db
+from database import get_db, get_read_db
 from services.recommendation_service import update_interest_scores
+from services.counter_service import adjust_like_counters, adjust_comment_counters
+from services.wiki_service import load_content_tags
+from services.event_queue import event_queue
+from services.feed_queue import feed_queues
+from services.user_service import current_user_id
+from services import repository
+from config import COMMENTS_PAGE_SIZE, COMMENTS_MAX_PAGE
 
 router = APIRouter()
 
@@ -22,42 +30,35 @@ class CommentRequest(BaseModel):
 @router.post("/api/toggle_like")
 async def toggle_like(
     data: ToggleLikeRequest,
-    username: str = Cookie(None),
+    user_id: Optional[int] = Depends(current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if not user:
+    if user_id is None:
         return JSONResponse({"error": "Not authenticated"}, status_code=401)
 
+    # Unlike if there is a like, otherwise like; counters move by the rows that actually changed,
+    # so concurrent toggles of the same article cannot push them out of step with the table
     result = await db.execute(
-        select(Like).filter(
-            and_(Like.user_id == user.id, Like.content_id == data.content_id)
-        )
+        delete(Like).where(and_(Like.user_id == user_id, Like.content_id == data.content_id))
     )
-    existing_like = result.scalars().first()
-
-    is_liked = False
-    content = None
-
-    if existing_like:
-        await db.delete(existing_like)
+    inserted = 0
+    if result.rowcount:
+        is_liked = False
+        await adjust_like_counters(db, user_id, data.content_id, -result.rowcount)
     else:
-        result = await db.execute(select(WikiContent).filter(WikiContent.content_id == data.content_id))
-        content = result.scalars().first()
-        new_like = Like(user_id=user.id, content_id=data.content_id)
-        db.add(new_like)
         is_liked = True
-
-        if content:
-            await update_interest_scores(db, user.id, {
-                'title': content.title,
-                'related': [],
-                'categories': []
-            }, weight_multiplier=10.0)
+        inserted = await repository.insert_ignore(
+            db, Like, [{"user_id": user_id, "content_id": data.content_id}],
+            conflict_columns=[Like.user_id, Like.content_id]
+        )
+        if inserted:
+            await adjust_like_counters(db, user_id, data.content_id, inserted)
 
     await db.commit()
 
+    if inserted:
+        await event_queue.track_signal(db, user_id, data.content_id, weight=10.0)
+
     return JSONResponse({
         "is_liked": is_liked,
         "content_id": data.content_id
@@ -67,33 +68,40 @@ async def toggle_like(
 @router.get("/api/comments/{content_id}")
 async def get_comments(
     content_id: str,
-    db: AsyncSession = Depends(get_db)
+    after: int = 0,
+    limit: int = COMMENTS_PAGE_SIZE,
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """One page of a comment thread, oldest first; pass next_after back as after for the next page"""
+    limit = max(1, min(limit, COMMENTS_MAX_PAGE))
+    # Title, comments and their authors in one query; the article row is outer joined
+    # so an empty page still carries the title. One row past the page tells if there is more.
     result = await db.execute(
-        select(Comment).filter(Comment.content_id == content_id)
-    )
-    comments = result.scalars().all()
-
-    result = await db.execute(
-        select(WikiContent).filter(WikiContent.content_id == content_id)
+        select(WikiContent.title, Comment.id, Comment.text, User.username)
+        .outerjoin(Comment, and_(Comment.content_id == WikiContent.content_id, Comment.id > after))
+        .outerjoin(User, User.id == Comment.user_id)
+        .where(WikiContent.content_id == content_id)
+        .order_by(Comment.id)
+        .limit(limit + 1)
     )
-    content = result.scalars().first()
-
-    # Fetch users for comments
-    comments_data = []
-    for c in comments:
-        user_result = await db.execute(select(User).filter(User.id == c.user_id))
-        user = user_result.scalars().first()
-        comments_data.append({
-            "id": c.id,
-            "text": c.text,
-            "user": {"username": user.username if user else "Unknown"},
-            "content_id": c.content_id
-        })
+    rows = result.all()
+    page_title = rows[0].title if rows else "Unknown"
+    rows = [row for row in rows if row.id is not None]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     return JSONResponse({
-        "comments": comments_data,
-        "page_title": content.title if content else "Unknown"
+        "comments": [
+            {
+                "id": row.id,
+                "text": row.text,
+                "user": {"username": row.username or "Unknown"},
+                "content_id": content_id
+            }
+            for row in rows
+        ],
+        "page_title": page_title,
+        "next_after": rows[-1].id if has_more else None
     })
 
 
@@ -101,33 +109,27 @@ async def get_comments(
 async def post_comment(
     data: CommentRequest,
     username: str = Cookie(None),
+    user_id: Optional[int] = Depends(current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if not user:
+    if user_id is None:
         return JSONResponse({"error": "Not authenticated"}, status_code=401)
 
-    result = await db.execute(
-        select(WikiContent).filter(WikiContent.content_id == data.content_id)
-    )
-    content = result.scalars().first()
-    if content:
-        await update_interest_scores(db, user.id, {
-            'title': content.title,
-            'related': [],
-            'categories': []
-        }, weight_multiplier=5.0)
-
-    new_comment = Comment(user_id=user.id, content_id=data.content_id, text=data.text)
+    tags = await load_content_tags(db, [data.content_id])
+    if data.content_id in tags:
+        await update_interest_scores(db, user_id, tags[data.content_id], weight_multiplier=5.0)
+
+    new_comment = Comment(user_id=user_id, content_id=data.content_id, text=data.text)
     db.add(new_comment)
+    await adjust_comment_counters(db, user_id, data.content_id, 1)
     await db.commit()
+    feed_queues.invalidate([user_id])
 
     return JSONResponse({
         "comment": {
             "id": new_comment.id,
             "text": new_comment.text,
-            "user": {"username": user.username},
+            "user": {"username": username},
             "content_id": new_comment.content_id
         }
     })
@@ -136,29 +138,12 @@ async def post_comment(
 @router.post("/api/share")
 async def track_share(
     data: ToggleLikeRequest,
-    username: str = Cookie(None),
+    user_id: Optional[int] = Depends(current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if not user:
+    if user_id is None:
         return JSONResponse({"success": False})
 
-    result = await db.execute(
-        select(WikiContent).filter(WikiContent.content_id == data.content_id)
-    )
-    content = result.scalars().first()
-
-    from models import Share
-    new_share = Share(user_id=user.id, content_id=data.content_id)
-    db.add(new_share)
-
-    if content:
-        await update_interest_scores(db, user.id, {
-            'title': content.title,
-            'related': [],
-            'categories': []
-        }, weight_multiplier=8.0)
-
-    await db.commit()
-    return JSONResponse({"success": True})
+    # Written by the event queue's next flush
+    await event_queue.track_share(db, user_id, data.content_id, weight=8.0)
+    return JSONResponse({"success": True}, status_code=202)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.event_queue import event_queue
+from services.payload_cache import payload_cache
+from services.ranking_service import ranking_engine
+from services.tag_index import tag_index
+from services.recommendation_service import interest_retrieval_stats
+from services.feed_queue import feed_queues
+from services.leader import leader
+from services.content_sync import content_sync
+from services.wiki_fetcher import wiki_breaker, negative_titles
+from services.user_service import user_cache
+from services.metrics import registry
+
+router = APIRouter()
+
+# Component stats also shown on /api/stats, exported as thinktok_<component>_<stat> gauges
+COMPONENT_STATS = {
+    "event_queue": event_queue.stats,
+    "payload_cache": payload_cache.stats,
+    "user_cache": user_cache.stats,
+    "ranking": ranking_engine.stats,
+    "tag_index": tag_index.stats,
+    "interest_retrieval": interest_retrieval_stats,
+    "feed_queues": feed_queues.stats,
+    "wikipedia_breaker": wiki_breaker.stats,
+    "wikipedia_negative_cache": negative_titles.stats,
+}
+
+
+def _component_gauges():
+    for component, stats in COMPONENT_STATS.items():
+        for key, value in stats().items():
+            # Numbers and flags only; states become one gauge per state
+            if isinstance(value, str):
+                yield f"thinktok_{component}_{key}", f"{component} {key}", {(value,): 1}, (key,)
+            elif isinstance(value, (int, float)):
+                yield f"thinktok_{component}_{key}", f"{component} {key}", {(): value}, ()
+    yield "thinktok_worker_leader", "1 in the worker running singleton tasks", {(): leader.is_leader}, ()
+    yield "thinktok_content_synced", "Articles picked up from other workers", {(): content_sync.synced}, ()
+
+
+registry.add_collector(_component_gauges)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Prometheus text format; with several workers each scrape sees the process that answered"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,41 +1,30 @@
-from fastapi import APIRouter, Cookie, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from models import User, Like, Comment
-from database import get_db
+from models import User
+from database import get_read_db
+from services.user_service import current_user_id
 
 router = APIRouter()
 
 
 @router.get("/api/profile")
 async def get_profile(
-    username: str = Cookie(None),
-    db: AsyncSession = Depends(get_db)
+    user_id: Optional[int] = Depends(current_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    if not username:
+    user = await db.get(User, user_id) if user_id is not None else None
+    if not user:
         return JSONResponse({"error": "Not authenticated"}, status_code=401)
 
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-
-    result = await db.execute(
-        select(func.count(Like.id)).filter(Like.user_id == user.id)
-    )
-    liked_count = result.scalar() or 0
-
-    result = await db.execute(
-        select(func.count(Comment.id)).filter(Comment.user_id == user.id)
-    )
-    comment_count = result.scalar() or 0
-
     return JSONResponse({
         "user": {
             "id": user.id,
             "username": user.username
         },
         "stats": {
-            "likes": liked_count,
-            "comments": comment_count
+            "likes": user.like_count or 0,
+            "comments": user.comment_count or 0
         }
     })
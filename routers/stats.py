@@ -0,0 +1,40 @@
+import os
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services.event_queue import event_queue
+from services.payload_cache import payload_cache, access_tracker
+from services.ranking_service import ranking_engine
+from services.interest_decay import interest_compactor
+from services.tag_index import tag_index
+from services.recommendation_service import interest_retrieval_stats
+from services.feed_queue import feed_queues
+from services.leader import leader
+from services.content_sync import content_sync
+from services.shared_store import shared_store
+from services.wiki_fetcher import wiki_breaker, negative_titles
+from services.user_service import user_cache
+
+router = APIRouter()
+
+
+@router.get("/api/stats")
+async def get_stats():
+    """Internal counters for the background workers and caches"""
+    return JSONResponse({
+        "event_queue": event_queue.stats(),
+        "payload_cache": payload_cache.stats(),
+        "access_tracker": {"pending": access_tracker.pending},
+        "ranking": ranking_engine.stats(),
+        "interest_compactor": {"pruned": interest_compactor.pruned},
+        "tag_index": tag_index.stats(),
+        "interest_retrieval": interest_retrieval_stats(),
+        "feed_queues": feed_queues.stats(),
+        "wikipedia": {"breaker": wiki_breaker.stats(), "negative_cache": negative_titles.stats()},
+        "user_cache": user_cache.stats(),
+        "worker": {
+            "pid": os.getpid(),
+            "leader": leader.is_leader,
+            "shared_store": type(shared_store).__name__ if shared_store is not None else None,
+            "content_synced": content_sync.synced
+        }
+    })
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select
+from database import AsyncSessionLocal
+from models import WikiContent
+from services.wiki_service import item_tags
+from services.sampling_service import content_index
+from services.tag_index import tag_index
+from services.ranking_service import ranking_engine
+from services.metrics import record_error
+from config import CONTENT_SYNC_INTERVAL
+
+# Articles commit a moment after their created_at is set, look back this far
+OVERLAP = timedelta(seconds=30)
+
+
+class ContentSync:
+    """Adds articles other worker processes cached to this worker's in-memory indexes.
+
+    The insert hooks only see inserts made by their own process, so in multi-worker
+    mode every worker polls wiki_content for rows created since its last pass.
+    Re-adding an id is a no-op for every index.
+    """
+
+    def __init__(self, interval: float = CONTENT_SYNC_INTERVAL):
+        self.interval = interval
+        self.synced = 0
+        self._since = datetime.now(timezone.utc)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="content-sync")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"Content sync failed: {e}")
+                record_error("content_sync")
+
+    async def sync(self):
+        started = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(WikiContent.content_id, WikiContent.categories, WikiContent.related_links)
+                .where(WikiContent.created_at >= self._since - OVERLAP)
+            )
+            rows = result.all()
+        for content_id, categories, related_links in rows:
+            tags = item_tags({
+                'categories': json.loads(categories) if categories else [],
+                'related': json.loads(related_links) if related_links else []
+            })
+            content_index.add(content_id)
+            if tag_index.loaded:
+                tag_index.add(content_id, tags)
+            if ranking_engine.ready:
+                ranking_engine.add(content_id, tags)
+        self._since = started
+        self.synced += len(rows)
+
+
+content_sync = ContentSync()
@@ -0,0 +1,46 @@
+import asyncio
+from sqlalchemy import update, select, func
+from models import User, WikiContent, Like, Comment
+
+
+async def adjust_like_counters(db, user_id: int, content_id: str, delta: int):
+    """Move the like counters of a user and an article by delta"""
+    await db.execute(
+        update(WikiContent).where(WikiContent.content_id == content_id)
+        .values(like_count=WikiContent.like_count + delta)
+    )
+    await db.execute(update(User).where(User.id == user_id).values(like_count=User.like_count + delta))
+
+
+async def adjust_comment_counters(db, user_id: int, content_id: str, delta: int):
+    """Move the comment counters of a user and an article by delta"""
+    await db.execute(
+        update(WikiContent).where(WikiContent.content_id == content_id)
+        .values(comment_count=WikiContent.comment_count + delta)
+    )
+    await db.execute(update(User).where(User.id == user_id).values(comment_count=User.comment_count + delta))
+
+
+async def rebuild_counters(db):
+    """Recompute every counter from the likes and comments tables (session or connection)"""
+    await db.execute(update(WikiContent).values(
+        like_count=select(func.count(Like.id)).where(Like.content_id == WikiContent.content_id).scalar_subquery(),
+        comment_count=select(func.count(Comment.id)).where(Comment.content_id == WikiContent.content_id).scalar_subquery()
+    ))
+    await db.execute(update(User).values(
+        like_count=select(func.count(Like.id)).where(Like.user_id == User.id).scalar_subquery(),
+        comment_count=select(func.count(Comment.id)).where(Comment.user_id == User.id).scalar_subquery()
+    ))
+
+
+async def _repair():
+    from database import engine
+    async with engine.begin() as conn:
+        await rebuild_counters(conn)
+    await engine.dispose()
+    print("Counters rebuilt")
+
+
+if __name__ == "__main__":
+    # python -m services.counter_service
+    asyncio.run(_repair())
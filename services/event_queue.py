@@ -0,0 +1,177 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import View, Share
+from services.recommendation_service import add_tag_deltas, apply_interest_deltas
+from services.wiki_service import load_content_tags
+from services.feed_queue import feed_queues
+from services.metrics import record_error
+from config import EVENT_FLUSH_SIZE, EVENT_FLUSH_INTERVAL, EVENT_MAX_PENDING
+
+
+class EventQueue:
+    """In-process write-behind queue for views, shares and like signals.
+
+    Handlers enqueue and return at once. A background task writes everything
+    pending in one transaction when EVENT_FLUSH_SIZE events have piled up or
+    every EVENT_FLUSH_INTERVAL seconds. Interest weights are coalesced per user
+    and content before the flush, and per user and tag in the upsert.
+    """
+
+    def __init__(self, flush_size: int = EVENT_FLUSH_SIZE, flush_interval: float = EVENT_FLUSH_INTERVAL,
+                 max_pending: int = EVENT_MAX_PENDING):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._views: List[dict] = []
+        self._shares: List[dict] = []
+        self._signals: Dict[Tuple[int, str], float] = {}
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stats = {
+            "enqueued": 0, "flushed": 0, "flushes": 0, "errors": 0,
+            "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        return self._pending
+
+    def stats(self) -> dict:
+        stats = dict(self._stats, depth=self._pending)
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
+
+    def start(self):
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="event-queue-flusher")
+
+    async def stop(self):
+        """Stop the flusher and drain whatever is still pending.
+
+        The flusher is asked to exit rather than cancelled, so a flush in
+        progress finishes (or requeues its batch) before the final drain.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def track_view(self, db: AsyncSession, user_id: int, content_id: str, view_duration: float, weight: float):
+        self._views.append({
+            "user_id": user_id, "content_id": content_id,
+            "view_duration": view_duration, "timestamp": datetime.now(timezone.utc)
+        })
+        await self._add_signal(db, user_id, content_id, weight)
+
+    async def track_share(self, db: AsyncSession, user_id: int, content_id: str, weight: float):
+        self._shares.append({"user_id": user_id, "content_id": content_id, "timestamp": datetime.now(timezone.utc)})
+        await self._add_signal(db, user_id, content_id, weight)
+
+    async def track_signal(self, db: AsyncSession, user_id: int, content_id: str, weight: float):
+        """Interest-only signal, e.g. a like whose row was already written"""
+        await self._add_signal(db, user_id, content_id, weight)
+
+    async def _add_signal(self, db: AsyncSession, user_id: int, content_id: str, weight: float):
+        key = (user_id, content_id)
+        self._signals[key] = self._signals.get(key, 0.0) + weight
+        self._pending += 1
+        self._stats["enqueued"] += 1
+
+        if not self.running or self._pending >= self.max_pending:
+            # No flusher, or it has fallen behind: write on the caller's time and session
+            await self.flush(db)
+        elif self._pending >= self.flush_size:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self, db: AsyncSession = None):
+        """Write everything pending in one transaction, on db if given or on a new session"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            views, shares, signals, pending = self._views, self._shares, self._signals, self._pending
+            self._views, self._shares, self._signals, self._pending = [], [], {}, 0
+
+            start = time.perf_counter()
+            try:
+                if db is not None:
+                    await self._write(db, views, shares, signals)
+                else:
+                    async with AsyncSessionLocal() as session:
+                        await self._write(session, views, shares, signals)
+            except asyncio.CancelledError:
+                # e.g. the request flushing inline was cancelled; keep the batch for the next flush
+                self._requeue(views, shares, signals, pending)
+                raise
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"Event queue flush failed: {e}")
+                record_error("event_queue")
+                self._requeue(views, shares, signals, pending)
+                return
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._stats["flushes"] += 1
+            self._stats["flushed"] += pending
+            self._stats["last_flush_ms"] = elapsed_ms
+            self._stats["total_flush_ms"] += elapsed_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+
+    async def _write(self, db: AsyncSession, views: List[dict], shares: List[dict], signals: Dict[Tuple[int, str], float]):
+        # Existence check for the batch and interest tags, in one query
+        tags = await load_content_tags(db, {content_id for _, content_id in signals})
+
+        # Backends that enforce foreign keys would reject the whole batch for one unknown id
+        views = [view for view in views if view["content_id"] in tags]
+        shares = [share for share in shares if share["content_id"] in tags]
+        if views:
+            await db.execute(insert(View), views)
+        if shares:
+            await db.execute(insert(Share), shares)
+
+        deltas = {}
+        for (user_id, content_id), weight in signals.items():
+            if content_id in tags:
+                add_tag_deltas(deltas, user_id, tags[content_id], weight)
+        await apply_interest_deltas(db, deltas)
+
+        await db.commit()
+        feed_queues.invalidate({user_id for user_id, _ in deltas})
+
+    def _requeue(self, views: List[dict], shares: List[dict], signals: Dict[Tuple[int, str], float], pending: int):
+        """Put a failed batch back for the next flush, unless that would overflow the queue"""
+        if self._pending + pending > self.max_pending:
+            print(f"Event queue full, dropping {pending} events")
+            record_error("event_queue_overflow")
+            return
+        self._views = views + self._views
+        self._shares = shares + self._shares
+        for key, weight in signals.items():
+            self._signals[key] = self._signals.get(key, 0.0) + weight
+        self._pending += pending
+
+
+event_queue = EventQueue()
@@ -0,0 +1,190 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Container, Deque, Iterable, List, Optional
+from sqlalchemy import select
+from database import AsyncSessionLocal
+from models import UserInterest
+from services.recommendation_service import get_cached_personalized_feed
+from services.feed_service import enrich_feed_items
+from services.seen_service import SeenFilter, SeenSet, recent_views
+from services.metrics import record_error
+from config import (
+    FEED_QUEUE_SIZE, FEED_QUEUE_LOW_WATERMARK, FEED_QUEUE_MAX_USERS, FEED_QUEUE_IDLE, FEED_QUEUE_REBUILD_INTERVAL
+)
+
+
+class _UserQueue:
+    def __init__(self):
+        self.items: Deque[dict] = deque()
+        # Everything queued since the last rebuild, so a top-up never repeats an item
+        self.queued = SeenFilter()
+        # Everything popped, so a rebuild does not queue it again
+        self.served = SeenFilter()
+        self.last_used = time.monotonic()
+        # Interests changed since the last rebuild, which ran at rebuilt_at
+        self.stale = False
+        self.rebuilt_at: Optional[float] = None
+
+
+class FeedQueues:
+    """Per-user queues of ranked, enriched feed items, refilled by a background task.
+
+    Feed requests pop from a user's queue. A refill is scheduled when the queue
+    drops below `low_watermark`, and a full rebuild when the user's interests
+    change, at most once per `rebuild_interval` seconds: later changes wait for
+    the next top-up after that. Refills only read the cache; articles still come
+    from the prefetcher.
+    Queues hold at most `size` items, and those of users idle for `idle` seconds
+    or beyond the `max_users` most recent are dropped.
+    """
+
+    def __init__(self, size: int = FEED_QUEUE_SIZE, low_watermark: int = FEED_QUEUE_LOW_WATERMARK,
+                 max_users: int = FEED_QUEUE_MAX_USERS, idle: float = FEED_QUEUE_IDLE,
+                 rebuild_interval: float = FEED_QUEUE_REBUILD_INTERVAL):
+        self.size = size
+        self.low_watermark = low_watermark
+        self.max_users = max_users
+        self.idle = idle
+        self.rebuild_interval = rebuild_interval
+        self._queues: "OrderedDict[int, _UserQueue]" = OrderedDict()
+        # user_id -> rebuild instead of top up
+        self._pending: "OrderedDict[int, bool]" = OrderedDict()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"pops": 0, "served": 0, "short": 0, "refills": 0, "rebuilds": 0, "deferred": 0,
+                       "evictions": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stats(self) -> dict:
+        return dict(self._stats, users=len(self._queues), items=sum(len(q.items) for q in self._queues.values()),
+                    pending=len(self._pending))
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="feed-queue-refiller")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def pop(self, user_id: int, count: int, exclude: Container[str]) -> List[dict]:
+        """Up to `count` ready items the request has not seen; an empty or short queue schedules a refill"""
+        if not self.running:
+            return []
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = _UserQueue()
+            self._evict()
+        self._queues.move_to_end(user_id)
+        queue.last_used = time.monotonic()
+
+        items = []
+        while queue.items and len(items) < count:
+            item = queue.items.popleft()
+            if item['content_id'] not in exclude:
+                items.append(item)
+                queue.served.add(item['content_id'])
+
+        self._stats["pops"] += 1
+        self._stats["served"] += len(items)
+        if len(items) < count:
+            self._stats["short"] += 1
+        if len(queue.items) < self.low_watermark:
+            self._schedule(user_id, rebuild=self._rebuild_due(queue))
+        return items
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Interests changed: rebuild the queues of these users, if they have one and were not just rebuilt"""
+        for user_id in user_ids:
+            queue = self._queues.get(user_id)
+            if queue is None:
+                continue
+            queue.stale = True
+            if self._rebuild_due(queue):
+                self._schedule(user_id, rebuild=True)
+            else:
+                self._stats["deferred"] += 1
+
+    def _rebuild_due(self, queue: _UserQueue) -> bool:
+        return queue.stale and (queue.rebuilt_at is None or time.monotonic() - queue.rebuilt_at >= self.rebuild_interval)
+
+    def _schedule(self, user_id: int, rebuild: bool):
+        self._pending[user_id] = self._pending.get(user_id, False) or rebuild
+        self._wake.set()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle
+        while self._queues:
+            user_id, queue = next(iter(self._queues.items()))
+            if len(self._queues) <= self.max_users and queue.last_used >= cutoff:
+                break
+            del self._queues[user_id]
+            self._pending.pop(user_id, None)
+            self._stats["evictions"] += 1
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            self._evict()
+            while self._pending:
+                user_id, rebuild = self._pending.popitem(last=False)
+                try:
+                    await self.refill(user_id, rebuild)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    print(f"Feed queue refill failed for user {user_id}: {e}")
+                    record_error("feed_queue")
+
+    async def refill(self, user_id: int, rebuild: bool = False):
+        queue = self._queues.get(user_id)
+        if queue is None:
+            return
+        wanted = self.size if rebuild else self.size - len(queue.items)
+        if wanted <= 0:
+            return
+        if rebuild:
+            # Interest changes from here on are not in this rebuild and mark the queue again
+            queue.stale = False
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(UserInterest).filter(UserInterest.user_id == user_id)
+                .order_by(UserInterest.score.desc()).limit(20)
+            )
+            interests = result.scalars().all()
+            seen = await recent_views(db, user_id)
+            # A rebuild discards the queued items, so they may be queued again; served ones may not
+            queued = SeenFilter() if rebuild else queue.queued
+            items = await get_cached_personalized_feed(db, interests, wanted, SeenSet(seen, queue.served, queued))
+            await enrich_feed_items(db, user_id, items)
+            await db.commit()
+
+        # The queue may have been evicted while this ran
+        if self._queues.get(user_id) is not queue:
+            return
+        if rebuild:
+            queue.items.clear()
+            queue.queued = queued
+            queue.rebuilt_at = time.monotonic()
+            self._stats["rebuilds"] += 1
+        else:
+            self._stats["refills"] += 1
+        for item in items[:self.size - len(queue.items)]:
+            queue.items.append(item)
+            queue.queued.add(item['content_id'])
+
+
+feed_queues = FeedQueues()
@@ -0,0 +1,29 @@
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from models import Like, WikiContent
+
+
+async def enrich_feed_items(db: AsyncSession, user_id: int, items: List[dict]) -> List[dict]:
+    """Add is_liked and comment_count to a page of feed items with two set-based queries"""
+    if not items:
+        return items
+
+    content_ids = list({item['content_id'] for item in items})
+
+    result = await db.execute(
+        select(Like.content_id).filter(Like.user_id == user_id, Like.content_id.in_(content_ids))
+    )
+    liked_ids = set(result.scalars().all())
+
+    result = await db.execute(
+        select(WikiContent.content_id, WikiContent.comment_count)
+        .filter(WikiContent.content_id.in_(content_ids))
+    )
+    comment_counts = dict(result.all())
+
+    for item in items:
+        item['is_liked'] = item['content_id'] in liked_ids
+        item['comment_count'] = comment_counts.get(item['content_id']) or 0
+
+    return items
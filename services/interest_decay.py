@@ -0,0 +1,174 @@
+import asyncio
+import math
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+from sqlalchemy import delete, select, update
+from database import AsyncSessionLocal
+from models import UserInterest, InterestDecayAnchor
+from services.metrics import record_error
+from services.repository import DIALECT
+from config import INTEREST_HALF_LIFE_DAYS, INTEREST_PRUNE_BELOW, INTEREST_COMPACT_INTERVAL, INTEREST_REANCHOR_HALF_LIVES
+
+# Anchor of databases created before it was stored, written by migration 8
+DEFAULT_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class Anchor(NamedTuple):
+    """Instant and half-life the stored scores are scaled to, persisted in the interest_decay row"""
+    epoch: datetime
+    half_life_days: float
+    version: int = 1
+
+    @property
+    def rate(self) -> float:
+        return math.log(2) / (self.half_life_days * 86400)  # per second
+
+    def half_lives(self, when: datetime = None) -> float:
+        return _seconds_since(self.epoch, when or datetime.now(timezone.utc)) / (self.half_life_days * 86400)
+
+
+# This worker's copy of the row; refreshed at startup, by PostgreSQL writers and once a rescale is due
+_anchor = Anchor(DEFAULT_EPOCH, INTEREST_HALF_LIFE_DAYS)
+
+
+def _utc(when: datetime) -> datetime:
+    # SQLite hands timestamps back without a timezone, they are written in UTC
+    return when.replace(tzinfo=timezone.utc) if when.tzinfo is None else when
+
+
+def _seconds_since(epoch: datetime, when: datetime) -> float:
+    return (_utc(when) - _utc(epoch)).total_seconds()
+
+
+def growth(when: datetime = None, anchor: Anchor = None) -> float:
+    """Factor between a live score at `when` and its stored, epoch-anchored value.
+
+    A weight added at time t is stored as weight * growth(t), so the live score at
+    any time is stored / growth(now). Every row shares the same divisor at a given
+    moment: ORDER BY score keeps using the (user_id, score) index, and decay needs
+    no writes. Stored scores grow as 2^(half-lives since the epoch), so the epoch
+    is moved forward (rescaling every row) after INTEREST_REANCHOR_HALF_LIVES.
+    """
+    anchor = anchor or _anchor
+    return math.exp(anchor.rate * _seconds_since(anchor.epoch, when or datetime.now(timezone.utc)))
+
+
+def stored_score(score: float, when: datetime = None, anchor: Anchor = None) -> float:
+    return score * growth(when, anchor)
+
+
+def live_score(stored: float, now: datetime = None) -> float:
+    return stored / growth(now)
+
+
+async def load_anchor(db, share: bool = False) -> Anchor:
+    """Read the anchor row into this worker's copy (session or connection), FOR SHARE if `share`"""
+    global _anchor
+    query = select(
+        InterestDecayAnchor.epoch, InterestDecayAnchor.half_life_days, InterestDecayAnchor.version
+    ).where(InterestDecayAnchor.id == 1)
+    if share:
+        query = query.with_for_update(read=True)
+    row = (await db.execute(query)).first()
+    if row is not None:
+        _anchor = Anchor(_utc(row.epoch), row.half_life_days, row.version)
+    return _anchor
+
+
+def check_anchor(anchor: Anchor):
+    """Warn when INTEREST_HALF_LIFE_DAYS differs from the stored half-life, which stays in use until a rescale"""
+    if anchor.half_life_days != INTEREST_HALF_LIFE_DAYS:
+        print(f"INTEREST_HALF_LIFE_DAYS is {INTEREST_HALF_LIFE_DAYS:g} but interest scores are stored with a "
+              f"{anchor.half_life_days:g}-day half-life; run `python migrations.py upgrade` to rescale them")
+
+
+async def lock_anchor(db) -> Anchor:
+    """Anchor to scale an interest write with.
+
+    PostgreSQL reads the row FOR SHARE: writers do not block each other, and a
+    rescale, which updates the row in reanchor, waits for their transactions or
+    makes them wait and read what it wrote. SQLite costs no extra statement: the
+    row only changes when a rescale is due, so this worker's copy is re-read once
+    its epoch is INTEREST_REANCHOR_HALF_LIVES old, until the compactor has moved it.
+    """
+    if DIALECT == "postgresql":
+        return await load_anchor(db, share=True)
+    if _anchor.half_lives() > INTEREST_REANCHOR_HALF_LIVES:
+        return await load_anchor(db)
+    return _anchor
+
+
+async def reanchor(db, half_life_days: float = INTEREST_HALF_LIFE_DAYS, now: datetime = None) -> Anchor:
+    """Move the epoch to now and switch to `half_life_days`, rescaling every stored score (committed by the caller)"""
+    global _anchor
+    now = now or datetime.now(timezone.utc)
+    # Lock the row exclusively first so writers wait, then rescale against what it held
+    await db.execute(update(InterestDecayAnchor).where(InterestDecayAnchor.id == 1)
+                     .values(version=InterestDecayAnchor.version + 1))
+    old = await load_anchor(db)
+    # Live scores at `now`, which is what the new epoch stores them as
+    await db.execute(update(UserInterest).values(score=UserInterest.score * (1 / growth(now, old))))
+    await db.execute(update(InterestDecayAnchor).where(InterestDecayAnchor.id == 1)
+                     .values(epoch=now, half_life_days=half_life_days))
+    _anchor = Anchor(now, half_life_days, old.version)
+    print(f"Interest scores rescaled from a {old.half_life_days:g}-day half-life at {old.epoch:%Y-%m-%d} "
+          f"to {half_life_days:g} days at {now:%Y-%m-%d}")
+    return _anchor
+
+
+async def ensure_anchor(conn) -> Anchor:
+    """Load the anchor at startup, rescaling if INTEREST_HALF_LIFE_DAYS changed or the epoch is too old"""
+    anchor = await load_anchor(conn)
+    if anchor.half_life_days != INTEREST_HALF_LIFE_DAYS or anchor.half_lives() > INTEREST_REANCHOR_HALF_LIVES:
+        anchor = await reanchor(conn)
+    return anchor
+
+
+class InterestCompactor:
+    """Background task that deletes interests whose decayed score fell below `threshold`.
+
+    Also moves the epoch forward once it is INTEREST_REANCHOR_HALF_LIVES old.
+    """
+
+    def __init__(self, threshold: float = INTEREST_PRUNE_BELOW, interval: float = INTEREST_COMPACT_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.pruned = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="interest-compactor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                print(f"Interest compaction failed: {e}")
+                record_error("interest_compactor")
+            await asyncio.sleep(self.interval)
+
+    async def compact(self) -> int:
+        async with AsyncSessionLocal() as db:
+            anchor = await lock_anchor(db)
+            if anchor.half_lives() > INTEREST_REANCHOR_HALF_LIVES:
+                anchor = await reanchor(db, anchor.half_life_days)
+            result = await db.execute(
+                delete(UserInterest).where(UserInterest.score < stored_score(self.threshold, anchor=anchor))
+            )
+            await db.commit()
+        self.pruned += result.rowcount
+        return result.rowcount
+
+
+interest_compactor = InterestCompactor()
@@ -0,0 +1,89 @@
+import asyncio
+import fcntl
+import os
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+from config import LEADER_LOCK_FILE, LEADER_RETRY_INTERVAL
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock across worker processes, blocking until it is free"""
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class LeaderElection:
+    """Elects one worker process to run the singleton background tasks.
+
+    Every worker tries to take a non-blocking flock on `path`; the one that gets it
+    starts the registered tasks and holds the lock until it exits. The OS drops the
+    lock with the process, so a follower takes over on its next retry.
+    """
+
+    def __init__(self, path: str = LEADER_LOCK_FILE, retry_interval: float = LEADER_RETRY_INTERVAL):
+        self.path = path
+        self.retry_interval = retry_interval
+        self._on_elected: List[Callable[[], None]] = []
+        self._on_resign: List[Callable] = []
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def register(self, start: Callable[[], None], stop: Callable):
+        """start() runs once this worker is elected, await stop() when it shuts down"""
+        self._on_elected.append(start)
+        self._on_resign.append(stop)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="leader-election")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            for stop in self._on_resign:
+                await stop()
+            self._release()
+
+    def _try_acquire(self) -> bool:
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._lock_file = lock_file
+        return True
+
+    def _release(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+
+    async def _run(self):
+        while not self._try_acquire():
+            await asyncio.sleep(self.retry_interval)
+        print(f"Worker {os.getpid()} elected to run background tasks")
+        for start in self._on_elected:
+            start()
+
+
+leader = LeaderElection()
@@ -0,0 +1,264 @@
+import json
+import os
+import random
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from config import METRICS_SERVER_TIMING, SLOW_REQUEST_MS, SLOW_REQUEST_SAMPLE
+
+# Seconds; request latencies from a cached feed page up to a feed waiting on Wikipedia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Observations counted into fixed buckets; cumulative counts are built at render time"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics of this process in the Prometheus text format.
+
+    Counters and histograms are updated in place; gauges come from collectors,
+    callables returning (name, documentation, {labels tuple: value}, labelnames)
+    read at scrape time, so component stats() need no bookkeeping of their own.
+    With several uvicorn workers each process keeps its own registry.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[tuple]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            for name, documentation, values, labelnames in collector():
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+                for labels, value in values.items():
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "thinktok_http_requests_total", "HTTP requests by route template, method and status", ("route", "method", "status"))
+http_latency = registry.histogram(
+    "thinktok_http_request_duration_seconds", "Time to the response headers, by route template", ("route", "method"))
+http_db_statements = registry.histogram(
+    "thinktok_http_request_db_statements", "SQL statements run per request", ("route",), COUNT_BUCKETS)
+http_db_time = registry.histogram(
+    "thinktok_http_request_db_seconds", "Time spent in SQL statements per request", ("route",))
+db_statements = registry.histogram(
+    "thinktok_db_statement_duration_seconds", "SQL statement latency, requests and background tasks",
+    buckets=STATEMENT_BUCKETS)
+wiki_fetches = registry.histogram(
+    "thinktok_wikipedia_fetch_duration_seconds",
+    "Wikipedia calls including retries, by outcome (ok, not_found, error, rejected)", ("outcome",))
+errors = registry.counter(
+    "thinktok_errors_total", "Handled failures by component", ("component",))
+
+
+class RequestTimings:
+    """Work done on behalf of one request; fetch tasks it spawns share it through the context"""
+
+    __slots__ = ("db_statements", "db_seconds", "wiki_calls", "wiki_seconds")
+
+    def __init__(self):
+        self.db_statements = 0
+        self.db_seconds = 0.0
+        self.wiki_calls = 0
+        self.wiki_seconds = 0.0
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def record_wiki_fetch(seconds: float, outcome: str):
+    wiki_fetches.observe(seconds, outcome)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.wiki_calls += 1
+        timings.wiki_seconds += seconds
+
+
+def record_error(component: str):
+    errors.inc(component)
+
+
+def instrument_engine(engine):
+    """Time every statement on an AsyncEngine and charge it to the current request"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_statements.observe(elapsed)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.db_statements += 1
+            timings.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        record_error("database")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB work per route template.
+
+    With METRICS_SERVER_TIMING the response carries a Server-Timing header with
+    the app, db and wiki time. Requests slower than SLOW_REQUEST_MS are written
+    as one JSON line each, for a SLOW_REQUEST_SAMPLE fraction of them.
+    """
+
+    def __init__(self, app, server_timing: bool = METRICS_SERVER_TIMING,
+                 slow_ms: float = SLOW_REQUEST_MS, slow_sample: float = SLOW_REQUEST_SAMPLE):
+        self.app = app
+        self.server_timing = server_timing
+        self.slow_ms = slow_ms
+        self.slow_sample = slow_sample
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        elapsed = None
+
+        async def send_wrapper(message):
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                if self.server_timing:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", self._server_timing(elapsed, timings).encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            record_error("http")
+            raise
+        finally:
+            current_timings.reset(token)
+            if elapsed is None:
+                elapsed = time.perf_counter() - started
+            # Route templates keep the label set small; unrouted paths (static files, 404s) share one
+            route = getattr(scope.get("route"), "path", None) or "other"
+            method = scope["method"]
+            http_requests.inc(route, method, str(status))
+            http_latency.observe(elapsed, route, method)
+            http_db_statements.observe(timings.db_statements, route)
+            http_db_time.observe(timings.db_seconds, route)
+            if self.slow_ms and elapsed * 1000 >= self.slow_ms and random.random() < self.slow_sample:
+                self._log_slow(scope, route, method, status, elapsed, timings)
+
+    @staticmethod
+    def _server_timing(elapsed: float, timings: RequestTimings) -> str:
+        return (f'app;dur={elapsed * 1000:.1f}, '
+                f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_statements} statements", '
+                f'wiki;dur={timings.wiki_seconds * 1000:.1f};desc="{timings.wiki_calls} calls"')
+
+    @staticmethod
+    def _log_slow(scope, route: str, method: str, status: int, elapsed: float, timings: RequestTimings):
+        print(json.dumps({
+            "event": "slow_request",
+            "pid": os.getpid(),
+            "method": method,
+            "route": route,
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 1),
+            "db_statements": timings.db_statements,
+            "db_ms": round(timings.db_seconds * 1000, 1),
+            "wiki_calls": timings.wiki_calls,
+            "wiki_ms": round(timings.wiki_seconds * 1000, 1),
+        }), flush=True)
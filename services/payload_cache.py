@@ -0,0 +1,175 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import update, bindparam
+from database import AsyncSessionLocal
+from models import WikiContent
+from services.shared_store import shared_store
+from services.metrics import record_error
+from config import PAYLOAD_CACHE_SIZE, PAYLOAD_CACHE_TTL, ACCESS_FLUSH_INTERVAL
+
+
+class PayloadCache:
+    """Bounded LRU of built feed item payloads keyed by content_id, with a TTL.
+
+    Payloads are returned as shallow copies so per-user fields added by feed
+    enrichment never leak into the cache. With a shared store configured, local
+    misses are looked up there before the DB, so workers build each payload once.
+    """
+
+    def __init__(self, max_items: int = PAYLOAD_CACHE_SIZE, ttl: float = PAYLOAD_CACHE_TTL, store=shared_store):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.store = store
+        self._items: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._stats = {
+            "hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+            "shared_hits": 0, "shared_errors": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, content_id: str) -> Optional[dict]:
+        entry = self._items.get(content_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            del self._items[content_id]
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._items.move_to_end(content_id)
+        self._stats["hits"] += 1
+        return dict(payload)
+
+    def put(self, content_id: str, payload: dict):
+        self._items[content_id] = (time.monotonic() + self.ttl, dict(payload))
+        self._items.move_to_end(content_id)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get_shared(self, content_ids: List[str]) -> Dict[str, dict]:
+        """Payloads other workers built, copied into the local LRU"""
+        if self.store is None or not content_ids:
+            return {}
+        try:
+            values = await self.store.get_many([f"payload:{content_id}" for content_id in content_ids])
+        except Exception as e:
+            # The shared tier is an optimisation, fall through to the DB
+            self._stats["shared_errors"] += 1
+            print(f"Shared payload lookup failed: {e}")
+            record_error("shared_store")
+            return {}
+        found = {}
+        for content_id, value in zip(content_ids, values):
+            if value is not None:
+                payload = json.loads(value)
+                self.put(content_id, payload)
+                found[content_id] = dict(payload)
+        self._stats["shared_hits"] += len(found)
+        return found
+
+    async def put_shared(self, payloads: Dict[str, dict]):
+        if self.store is None or not payloads:
+            return
+        try:
+            await self.store.set_many(
+                {f"payload:{content_id}": json.dumps(payload) for content_id, payload in payloads.items()}, self.ttl
+            )
+        except Exception as e:
+            self._stats["shared_errors"] += 1
+            print(f"Shared payload store failed: {e}")
+            record_error("shared_store")
+
+    def invalidate(self, content_id: str = None):
+        """Drop one payload, or everything when no id is given"""
+        if content_id is None:
+            self._stats["invalidations"] += len(self._items)
+            self._items.clear()
+        elif self._items.pop(content_id, None) is not None:
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return dict(self._stats, size=len(self._items), hit_ratio=self._stats["hits"] / lookups if lookups else 0.0)
+
+
+class AccessTracker:
+    """Accumulates access_count/last_accessed bumps in memory and writes them in one batch"""
+
+    def __init__(self, interval: float = ACCESS_FLUSH_INTERVAL):
+        self.interval = interval
+        self._counts: Dict[str, int] = {}
+        self._last_accessed: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, content_id: str):
+        self._counts[content_id] = self._counts.get(content_id, 0) + 1
+        self._last_accessed[content_id] = datetime.now(timezone.utc)
+
+    @property
+    def pending(self) -> int:
+        return len(self._counts)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="access-flusher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Access count flush failed: {e}")
+                record_error("access_tracker")
+
+    async def flush(self):
+        if not self._counts:
+            return
+        counts, last_accessed = self._counts, self._last_accessed
+        self._counts, self._last_accessed = {}, {}
+
+        table = WikiContent.__table__
+        stmt = (
+            update(table).where(table.c.content_id == bindparam("b_content_id"))
+            .values(access_count=table.c.access_count + bindparam("b_count"), last_accessed=bindparam("b_last"))
+        )
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(stmt, [
+                    {"b_content_id": content_id, "b_count": count, "b_last": last_accessed[content_id]}
+                    for content_id, count in counts.items()
+                ])
+                await db.commit()
+        except BaseException:
+            # Failed or cancelled (stop() during a flush): keep the bumps for the next flush
+            self._merge(counts, last_accessed)
+            raise
+
+    def _merge(self, counts: Dict[str, int], last_accessed: Dict[str, datetime]):
+        for content_id, count in counts.items():
+            self._counts[content_id] = self._counts.get(content_id, 0) + count
+            if content_id not in self._last_accessed:
+                self._last_accessed[content_id] = last_accessed[content_id]
+
+
+payload_cache = PayloadCache()
+access_tracker = AccessTracker()
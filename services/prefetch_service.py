@@ -0,0 +1,157 @@
+import asyncio
+import time
+from typing import Iterable, List, Optional
+from sqlalchemy import select, func, exists
+from database import AsyncSessionLocal
+from models import WikiContent, UserInterest, View
+from services.wiki_service import generate_content_id, get_or_create_wiki_content, cache_wiki_contents
+from services.wiki_fetcher import negative_titles
+from services.metrics import record_error
+from config import (
+    PREFETCH_POOL_SIZE, PREFETCH_INTEREST_TAGS, PREFETCH_RATE, PREFETCH_INTERVAL, WIKI_BATCH_ENABLED, WIKI_BATCH_SIZE
+)
+
+
+class ContentPrefetcher:
+    """Background worker that keeps a warm pool of cached WikiContent.
+
+    Keeps `pool_size` articles nobody has viewed yet in the cache, plus the articles
+    for the most popular interest tags. Feed endpoints read from that pool instead
+    of waiting on Wikipedia. Counting unseen articles and ranking tags scans whole
+    tables, so both are refreshed once per `interval`; refills woken in between
+    work from those figures.
+    """
+
+    def __init__(self, pool_size: int = PREFETCH_POOL_SIZE, interest_tags: int = PREFETCH_INTEREST_TAGS,
+                 rate: float = PREFETCH_RATE, interval: float = PREFETCH_INTERVAL):
+        self.pool_size = pool_size
+        self.interest_tags = interest_tags
+        self.min_delay = 1.0 / rate if rate > 0 else 0.0
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._requested: List[str] = []
+        self._short = False
+        # Figures from the last full check, see refill
+        self._unseen = 0
+        self._top_tags: List[str] = []
+        self._counted_at: Optional[float] = None
+        # Set on every worker when some worker keeps the pool filled, only the leader runs the task
+        self.enabled = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self.enabled = True
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="content-prefetcher")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def wake(self, short: bool = False):
+        """Ask for a refill check now instead of at the next interval; `short` when a feed ran out of cached articles"""
+        self._short = self._short or short
+        self._wake.set()
+
+    def request_titles(self, titles: Iterable[str]):
+        """Queue titles a feed wanted but could not find in the cache"""
+        if not self.running:
+            # A follower worker, the leader still picks interest tags up from the database
+            return
+        for title in titles:
+            if title not in self._requested and title not in negative_titles:
+                self._requested.append(title)
+        if self._requested:
+            self.wake()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Prefetcher refill failed: {e}")
+                record_error("prefetcher")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def refill(self):
+        """Fetch missing interest articles, then random articles until the pool is full"""
+        async with AsyncSessionLocal() as db:
+            if self._counted_at is None or time.monotonic() - self._counted_at >= self.interval:
+                await self._count(db)
+            titles = self._requested + [tag for tag in self._top_tags if tag not in self._requested]
+            self._requested = []
+
+            wanted = {generate_content_id(title): title for title in titles}
+            result = await db.execute(select(WikiContent.content_id).where(WikiContent.content_id.in_(wanted)))
+            cached = set(result.scalars().all())
+            await db.commit()
+
+        missing = [title for content_id, title in wanted.items() if content_id not in cached]
+        deficit = max(0, self.pool_size - self._unseen)
+        if self._short:
+            # A feed found nothing unseen for its user: top up by a batch even if the pool looks full
+            deficit = max(deficit, WIKI_BATCH_SIZE if WIKI_BATCH_ENABLED else 1)
+            self._short = False
+        # Counted as unseen until the next full check
+        self._unseen += deficit
+
+        if not WIKI_BATCH_ENABLED:
+            for title in missing:
+                await self._fetch(title)
+            for _ in range(deficit):
+                await self._fetch()
+            return
+
+        # Many articles per request: interest titles first, then random articles
+        for start in range(0, len(missing), WIKI_BATCH_SIZE):
+            await self._fetch_batch(titles=missing[start:start + WIKI_BATCH_SIZE])
+        for start in range(0, deficit, WIKI_BATCH_SIZE):
+            await self._fetch_batch(random_count=min(WIKI_BATCH_SIZE, deficit - start))
+
+    async def _count(self, db):
+        """Unseen cached articles and the most popular interest tags (both scan whole tables)"""
+        result = await db.execute(
+            select(func.count()).select_from(WikiContent)
+            .where(~exists().where(View.content_id == WikiContent.content_id))
+        )
+        self._unseen = result.scalar() or 0
+
+        result = await db.execute(
+            select(UserInterest.category_or_tag)
+            .group_by(UserInterest.category_or_tag)
+            .order_by(func.sum(UserInterest.score).desc())
+            .limit(self.interest_tags)
+        )
+        self._top_tags = list(result.scalars().all())
+        self._counted_at = time.monotonic()
+
+    async def _fetch(self, title: str = None):
+        async with AsyncSessionLocal() as db:
+            await get_or_create_wiki_content(db, title)
+        # Refill rate limit
+        await asyncio.sleep(self.min_delay)
+
+    async def _fetch_batch(self, titles: List[str] = (), random_count: int = 0):
+        async with AsyncSessionLocal() as db:
+            await cache_wiki_contents(db, titles, random_count)
+        await asyncio.sleep(self.min_delay)
+
+
+prefetcher = ContentPrefetcher()
@@ -0,0 +1,203 @@
+import asyncio
+import json
+from itertools import groupby
+from operator import itemgetter
+from typing import Container, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import WikiContent, ContentTag
+from services.wiki_service import item_tags
+from config import RANKING_ENABLED, RANKING_MERGE_ROWS
+
+# NumPy and SciPy are optional (pip install thinktok-backend[ranking]), without
+# them the feed keeps using interest tags as Wikipedia titles
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+
+class RankingEngine:
+    """Scores every cached article against a user's interest profile with one sparse product.
+
+    Articles are rows of a CSR matrix over a tag vocabulary built from their
+    categories and related links, weighted 1/sqrt(tags) so long tag lists do not
+    dominate. A user is a dense vector of UserInterest scores over the same
+    vocabulary, and a page is a top-k over `matrix @ user`.
+
+    New articles go to a small delta block that is folded into the main matrix
+    once it reaches `merge_rows`, so inserts never rebuild the whole matrix.
+    """
+
+    def __init__(self, merge_rows: int = RANKING_MERGE_ROWS):
+        self.merge_rows = merge_rows
+        self._vocabulary: Dict[str, int] = {}
+        self._content_ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._main = None
+        self._pending: List[Tuple[List[int], float]] = []
+        self._delta = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        return RANKING_ENABLED and np is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.available and self._loaded
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "articles": len(self._rows), "tags": len(self._vocabulary), "pending": len(self._pending)}
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded or not self.available:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            result = await db.execute(select(ContentTag.content_id, ContentTag.tag).order_by(ContentTag.content_id))
+            for content_id, rows in groupby(result.all(), key=itemgetter(0)):
+                self.add(content_id, [tag for _, tag in rows])
+            self._merge()
+            self._loaded = True
+
+    def add(self, content_id: str, tags: Iterable[str]):
+        if not self.available or content_id in self._rows:
+            return
+        columns = sorted({self._vocabulary.setdefault(tag, len(self._vocabulary)) for tag in tags})
+        self._rows[content_id] = len(self._content_ids)
+        self._content_ids.append(content_id)
+        self._pending.append((columns, 1.0 / np.sqrt(len(columns)) if columns else 0.0))
+        self._delta = None
+        if len(self._pending) >= self.merge_rows:
+            self._merge()
+
+    def discard(self, content_id: str):
+        # The row stays in the matrix, top_k skips it
+        row = self._rows.pop(content_id, None)
+        if row is not None:
+            self._content_ids[row] = None
+
+    def _pending_block(self):
+        indptr = np.zeros(len(self._pending) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(columns) for columns, _ in self._pending])
+        indices = np.fromiter((c for columns, _ in self._pending for c in columns), dtype=np.int32, count=indptr[-1])
+        data = np.repeat(np.array([w for _, w in self._pending], dtype=np.float32), np.diff(indptr))
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(self._pending), len(self._vocabulary)))
+
+    def _merge(self):
+        if not self._pending:
+            return
+        block = self._pending_block()
+        if self._main is None:
+            self._main = block
+        else:
+            self._main.resize((self._main.shape[0], len(self._vocabulary)))
+            self._main = sparse.vstack([self._main, block], format="csr")
+        self._pending, self._delta = [], None
+
+    def _blocks(self):
+        blocks = [self._main] if self._main is not None else []
+        if self._pending:
+            if self._delta is None:
+                self._delta = self._pending_block()
+            blocks.append(self._delta)
+        return blocks
+
+    def user_vector(self, interests: Iterable[Tuple[str, float]]):
+        vector = np.zeros(len(self._vocabulary), dtype=np.float32)
+        for tag, score in interests:
+            column = self._vocabulary.get(tag)
+            if column is not None:
+                vector[column] += score
+        return vector
+
+    def scores(self, interests: Iterable[Tuple[str, float]]):
+        """Score of every article row for one user"""
+        vector = self.user_vector(interests)
+        blocks = self._blocks()
+        if not blocks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate([block @ vector[:block.shape[1]] for block in blocks])
+
+    def top_k(self, interests: Iterable[Tuple[str, float]], k: int, exclude: Container[str] = ()) -> List[str]:
+        """Up to k best-scoring article ids not in exclude, skipping articles that share no tag with the user"""
+        if k <= 0 or not self.ready:
+            return []
+        scores = self.scores(interests)
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+
+        picked: List[str] = []
+        # Rank a small head first, sort every match only if exclude eats into it
+        head = min(len(candidates), k * 4 + 32)
+        for skip, n in ((0, head), (head, len(candidates))):
+            if skip >= n:
+                break
+            for row in self._ranked(scores, candidates, n)[skip:]:
+                content_id = self._content_ids[row]
+                if content_id is not None and content_id not in exclude:
+                    picked.append(content_id)
+                    if len(picked) >= k:
+                        return picked
+        return picked
+
+    @staticmethod
+    def _ranked(scores, candidates, n: int):
+        if n < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def top_k_many(self, profiles: Sequence[Iterable[Tuple[str, float]]], k: int, block_size: int = 64) -> List[List[str]]:
+        """top_k for many users at once, one sparse-by-dense product per block of users (no exclude)"""
+        if not self.ready:
+            return [[] for _ in profiles]
+        self._merge()
+        alive = np.array([content_id is not None for content_id in self._content_ids])
+        n = min(k, int(alive.sum()))
+        results = []
+        for start in range(0, len(profiles), block_size):
+            users = self._user_matrix(profiles[start:start + block_size])
+            # users x articles, dense; discarded rows can never make the cut
+            scores = np.ascontiguousarray((self._main @ users.T.toarray()).T)
+            scores[:, ~alive] = -np.inf
+            if not n:
+                results += [[] for _ in range(scores.shape[0])]
+                continue
+            top = np.argpartition(scores, -n, axis=1)[:, -n:]
+            for user_scores, rows in zip(scores, top):
+                rows = rows[np.argsort(-user_scores[rows], kind="stable")]
+                results.append([self._content_ids[row] for row in rows if user_scores[row] > 0])
+        return results
+
+    def _user_matrix(self, profiles: Sequence[Iterable[Tuple[str, float]]]):
+        rows, columns, data = [], [], []
+        for i, interests in enumerate(profiles):
+            for tag, score in interests:
+                column = self._vocabulary.get(tag)
+                if column is not None:
+                    rows.append(i)
+                    columns.append(column)
+                    data.append(score)
+        return sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), (rows, columns)), shape=(len(profiles), self._main.shape[1])
+        )
+
+
+ranking_engine = RankingEngine()
+
+
+@event.listens_for(WikiContent, "after_insert")
+def _rank_new_content(mapper, connection, target):
+    if ranking_engine.ready:
+        ranking_engine.add(target.content_id, item_tags({
+            'categories': json.loads(target.categories) if target.categories else [],
+            'related': json.loads(target.related_links) if target.related_links else []
+        }))
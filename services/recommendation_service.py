@@ -1,41 +1,163 @@
+import asyncio
 import random
-from typing import List, Set
+from typing import Container, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select
+from database import AsyncSessionLocal
 from models import UserInterest
 from datetime import datetime, timezone
-from services.wiki_service import get_or_create_wiki_content
+from services.wiki_service import get_or_create_wiki_content, get_cached_feed_items, generate_content_id, load_items
+from services.wiki_fetcher import wiki_breaker, negative_titles
+from services.prefetch_service import prefetcher
+from services.seen_service import SeenSet
+from services.ranking_service import ranking_engine
+from services.interest_decay import growth, live_score, lock_anchor
+from services.sampling_service import content_index
+from services.tag_index import tag_index
+from services import repository
+from services.metrics import record_error
+from config import FEED_FETCH_CONCURRENCY, FEED_FETCH_DEADLINE
 
+# Where interest slots were filled from, see interest_retrieval_stats
+_interest_stats = {"ranked": 0, "tag_index": 0, "titles": 0, "misses": 0}
 
-async def update_interest_scores(db: AsyncSession, user_id: int, content, weight_multiplier: float = 1.0):
-    """Update user interest scores based on content categories and links"""
-    try:
-        related = content.get('related', [])
-        categories = content.get('categories', [])
-        tags = categories[:10] + related[:5]
-    except:
-        tags = []
-
-    for tag in tags[:15]:
-        tag = tag[:50]
-        result = await db.execute(
-            select(UserInterest).filter(
-                and_(UserInterest.user_id == user_id, UserInterest.category_or_tag == tag)
-            )
-        )
-        interest = result.scalars().first()
-
-        if interest:
-            interest.score += weight_multiplier
-            interest.last_updated = datetime.now(timezone.utc)
+# Fetches still running after their feed request returned; they finish and warm the cache
+_detached: Set[asyncio.Task] = set()
+
+
+async def apply_interest_deltas(db: AsyncSession, deltas: Dict[Tuple[int, str], float]):
+    """Add score deltas keyed by (user_id, tag) with one INSERT ... ON CONFLICT DO UPDATE.
+
+    Deltas are stored scaled to the decay epoch, see services.interest_decay.
+    """
+    if not deltas:
+        return
+
+    now = datetime.now(timezone.utc)
+    scale = growth(now, await lock_anchor(db))
+    await repository.upsert(
+        db, UserInterest,
+        [
+            {"user_id": user_id, "category_or_tag": tag, "score": score * scale, "last_updated": now}
+            for (user_id, tag), score in deltas.items()
+        ],
+        conflict_columns=[UserInterest.user_id, UserInterest.category_or_tag],
+        update=lambda excluded: {
+            "score": UserInterest.score + excluded.score,
+            "last_updated": excluded.last_updated
+        }
+    )
+
+
+def add_tag_deltas(deltas: Dict[Tuple[int, str], float], user_id: int, tags: Iterable[str], weight_multiplier: float = 1.0):
+    """Accumulate the score changes for one interaction with an article carrying `tags`"""
+    for tag in tags:
+        key = (user_id, tag)
+        deltas[key] = deltas.get(key, 0.0) + weight_multiplier
+
+
+async def update_interest_scores(db: AsyncSession, user_id: int, tags: Iterable[str], weight_multiplier: float = 1.0):
+    """Update user interest scores for an article's tags, see load_content_tags (committed by the caller)"""
+    deltas = {}
+    add_tag_deltas(deltas, user_id, tags, weight_multiplier)
+    await apply_interest_deltas(db, deltas)
+
+
+def _forget(content_ids: Iterable[str]):
+    # Rows that have gone away since the in-memory indexes were built
+    for content_id in content_ids:
+        ranking_engine.discard(content_id)
+        tag_index.discard(content_id)
+        content_index.discard(content_id)
+
+
+async def _load_found(db: AsyncSession, content_ids: List[str]) -> List[dict]:
+    items = await load_items(db, content_ids)
+    found = {item['content_id'] for item in items}
+    _forget(content_id for content_id in content_ids if content_id not in found)
+    return items
+
+
+async def get_ranked_items(db: AsyncSession, interests: List[UserInterest], count: int, exclude: Container[str]) -> List[dict]:
+    """Best-scoring cached articles for the user's interests, empty until the ranking engine is loaded"""
+    if not interests or not ranking_engine.ready:
+        return []
+    return await _load_found(db, ranking_engine.top_k(
+        [(i.category_or_tag, live_score(i.score)) for i in interests], count, exclude
+    ))
+
+
+def interest_retrieval_stats() -> dict:
+    """Where interest slots were filled from; misses are the slots left to Wikipedia"""
+    slots = sum(_interest_stats.values())
+    hits = slots - _interest_stats["misses"]
+    return dict(_interest_stats, hit_ratio=hits / slots if slots else 0.0)
+
+
+async def get_interest_items(db: AsyncSession, interests: List[UserInterest], count: int, exclude: Container[str]) -> Tuple[List[dict], List[str]]:
+    """Fill up to `count` interest slots from the cache only.
+
+    Tries ranked articles, then a random cached article per interest tag from the
+    tag index, then an article titled after the tag. Returns the items and the
+    tags nothing cached was found for, which are the only ones worth fetching.
+    """
+    if not interests or count <= 0:
+        return [], []
+    seen_ids = SeenSet(exclude)
+
+    items = await get_ranked_items(db, interests, count, seen_ids)
+    _interest_stats["ranked"] += len(items)
+    for item in items:
+        seen_ids.add(item['content_id'])
+
+    tags = [i.category_or_tag for i in interests]
+    random.shuffle(tags)
+    picked, missed = [], []
+    for tag in tags:
+        if len(items) + len(picked) >= count:
+            break
+        content_id = tag_index.sample(tag, seen_ids)
+        if content_id is None:
+            missed.append(tag)
         else:
-            new_interest = UserInterest(user_id=user_id, category_or_tag=tag, score=weight_multiplier)
-            db.add(new_interest)
+            picked.append(content_id)
+            seen_ids.add(content_id)
+    tagged = await _load_found(db, picked)
+    _interest_stats["tag_index"] += len(tagged)
+    items += tagged
 
-    await db.commit()
+    if missed and len(items) < count:
+        wanted = {generate_content_id(tag): tag for tag in missed}
+        for item in await load_items(db, list(wanted)):
+            if len(items) >= count:
+                break
+            if item['content_id'] not in seen_ids:
+                items.append(item)
+                seen_ids.add(item['content_id'])
+                _interest_stats["titles"] += 1
+            # Cached under its own title, so a fetch would not bring anything new
+            missed.remove(wanted[item['content_id']])
+
+    _interest_stats["misses"] += count - len(items)
+    return items, missed
+
+
+async def get_cached_personalized_feed(db: AsyncSession, interests: List[UserInterest], count: int, exclude: Container[str]) -> List[dict]:
+    """Build a feed from the prefetched pool only; interest tags missing from it are queued for prefetch"""
+    seen_ids = SeenSet(exclude)
+    feed_items, missed = await get_interest_items(db, interests, int(count * 0.4), seen_ids)
+    for item in feed_items:
+        seen_ids.add(item['content_id'])
+    prefetcher.request_titles(missed)
+
+    feed_items += await get_cached_feed_items(db, count - len(feed_items), exclude=seen_ids)
+    if len(feed_items) < count:
+        # The pool ran dry for this user; otherwise the prefetcher's own interval is soon enough
+        prefetcher.wake(short=True)
+    return feed_items
 
 
-async def get_personalized_feed(db: AsyncSession, user_id: int, count: int = 5, exclude: Set[str] = None) -> List[dict]:
+async def get_personalized_feed(db: AsyncSession, user_id: int, count: int = 5, exclude: Container[str] = None) -> List[dict]:
     """Generate feed based on user interests"""
     if exclude is None:
         exclude = set()
@@ -46,22 +168,98 @@ async def get_personalized_feed(db: AsyncSession, user_id: int, count: int = 5,
     )
     interests = result.scalars().all()
 
+    # Serve from the warm pool while a prefetcher (in this worker or the leader) keeps it
+    # filled, or while Wikipedia is failing and a fetch would only wait for the breaker
+    if prefetcher.enabled or not wiki_breaker.available:
+        return await get_cached_personalized_feed(db, interests, count, exclude)
+
+    # Interest slots come from the cache when possible; only tags it has nothing for go to Wikipedia
+    interest_slots = int(count * 0.4)
+    feed_items, missed = await get_interest_items(db, interests, interest_slots, exclude)
+    exclude = SeenSet(exclude)
+    for item in feed_items:
+        exclude.add(item['content_id'])
+
+    # Nothing is read from this session while the fetches run, release its read transaction
+    await db.commit()
+    return feed_items + await fetch_candidates(
+        missed, count - len(feed_items), exclude, interest_slots=interest_slots - len(feed_items)
+    )
+
+
+async def _fetch_candidate(title: Optional[str]) -> Optional[dict]:
+    # One session per fetch, an AsyncSession cannot be shared between concurrent tasks
+    async with AsyncSessionLocal() as db:
+        return await get_or_create_wiki_content(db, title)
+
+
+async def fetch_candidates(titles: Sequence[str], count: int, exclude: Container[str], interest_slots: int = None,
+                           concurrency: int = FEED_FETCH_CONCURRENCY, deadline: float = FEED_FETCH_DEADLINE) -> List[dict]:
+    """Fetch up to `count` unseen articles, keeping `concurrency` interest or random fetches in flight.
+
+    Up to `interest_slots` items (default 40%) come from the interest `titles`, the
+    rest are random articles. Stops at `count * 10` attempts or after `deadline`
+    seconds and returns whatever has arrived; fetches still running are left to
+    finish in the background.
+    """
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline
+    if interest_slots is None:
+        interest_slots = int(count * 0.4)
+    # Titles that recently had no article would only burn an attempt
+    titles = [title for title in titles if title not in negative_titles]
+    max_attempts = count * 10
+
     feed_items = []
-    seen_ids = set(exclude)
+    seen_ids = SeenSet(exclude)
+    interest_items = 0
     attempts = 0
-    max_attempts = count * 10
+    in_flight: Dict[asyncio.Task, Optional[str]] = {}
 
-    while len(feed_items) < count and attempts < max_attempts:
-        attempts += 1
+    try:
+        while len(feed_items) < count:
+            # Top up to the concurrency cap, never asking for more than the missing items
+            while (attempts < max_attempts and wiki_breaker.available
+                   and len(in_flight) < min(concurrency, count - len(feed_items))):
+                attempts += 1
+                title = None
+                interest_in_flight = sum(1 for t in in_flight.values() if t is not None)
+                if titles and interest_items + interest_in_flight < interest_slots and attempts % 3 != 0:
+                    # Skip tags already being fetched so two tasks never insert the same article
+                    candidates = [t for t in titles if t not in in_flight.values()]
+                    if candidates:
+                        title = random.choice(candidates)
+                in_flight[asyncio.create_task(_fetch_candidate(title))] = title
 
-        if interests and len(feed_items) < int(count * 0.4) and attempts % 3 != 0:
-            interest = random.choice(interests)
-            item = await get_or_create_wiki_content(db, interest.category_or_tag)
-        else:
-            item = await get_or_create_wiki_content(db)
+            remaining = give_up_at - loop.time()
+            if not in_flight or remaining <= 0:
+                break
 
-        if item and item['content_id'] not in seen_ids:
-            feed_items.append(item)
-            seen_ids.add(item['content_id'])
+            done, _ = await asyncio.wait(in_flight, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                title = in_flight.pop(task)
+                if task.exception() is not None:
+                    # e.g. the database was locked while storing the article: a failed attempt, not a failed feed
+                    print(f"Candidate fetch failed for {title or 'a random article'}: {task.exception()!r}")
+                    record_error("feed_fetch")
+                    continue
+                item = task.result()
+                if item and item['content_id'] not in seen_ids and len(feed_items) < count:
+                    feed_items.append(item)
+                    seen_ids.add(item['content_id'])
+                    if title is not None:
+                        interest_items += 1
+    finally:
+        # Also when the request itself is cancelled; the fetches finish and warm the cache
+        for task in in_flight:
+            _detached.add(task)
+            task.add_done_callback(_finish_detached)
 
     return feed_items
+
+
+def _finish_detached(task: asyncio.Task):
+    _detached.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background candidate fetch failed: {task.exception()!r}")
+        record_error("feed_fetch")
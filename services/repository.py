@@ -0,0 +1,31 @@
+"""Dialect-specific statements, so the services run on SQLite and PostgreSQL alike"""
+from typing import Callable, Iterable, List
+from sqlalchemy.dialects import postgresql, sqlite
+from database import engine
+
+DIALECT = engine.dialect.name
+
+
+def insert(model):
+    """INSERT construct with on_conflict_* support for the configured backend"""
+    if DIALECT == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+async def upsert(db, model, rows: List[dict], conflict_columns: Iterable, update: Callable) -> None:
+    """Multi-row INSERT ... ON CONFLICT DO UPDATE; update(excluded) returns the SET clause"""
+    if not rows:
+        return
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(index_elements=list(conflict_columns), set_=update(stmt.excluded))
+    await db.execute(stmt)
+
+
+async def insert_ignore(db, model, rows: List[dict], conflict_columns: Iterable) -> int:
+    """Multi-row INSERT ... ON CONFLICT DO NOTHING; returns the number of rows actually inserted"""
+    if not rows:
+        return 0
+    stmt = insert(model).values(rows).on_conflict_do_nothing(index_elements=list(conflict_columns))
+    result = await db.execute(stmt)
+    return result.rowcount
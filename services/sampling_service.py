@@ -0,0 +1,89 @@
+import asyncio
+import random
+from typing import Container, Dict, List
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import WikiContent
+
+
+class ContentIdIndex:
+    """In-memory array of cached content ids for random sampling without scanning the table.
+
+    Loaded once with a single-column query, then kept current by the WikiContent
+    insert hook below. Ids whose rows have gone away are dropped when a sample
+    fails to load them.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            result = await db.execute(select(WikiContent.content_id))
+            for content_id in result.scalars():
+                self.add(content_id)
+            self._loaded = True
+
+    def add(self, content_id: str):
+        if content_id not in self._positions:
+            self._positions[content_id] = len(self._ids)
+            self._ids.append(content_id)
+
+    def discard(self, content_id: str):
+        # Swap with the last id so removal stays O(1)
+        position = self._positions.pop(content_id, None)
+        if position is None:
+            return
+        last = self._ids.pop()
+        if position < len(self._ids):
+            self._ids[position] = last
+            self._positions[last] = position
+
+    def sample(self, k: int, exclude: Container[str] = ()) -> List[str]:
+        """Pick up to k distinct ids not in exclude, in O(k) expected time unless exclude covers most of the cache"""
+        ids = self._ids
+        picked: List[str] = []
+        picked_set = set()
+        if k <= 0 or not ids:
+            return picked
+
+        attempts = 0
+        max_attempts = k * 8 + 32
+        while len(picked) < k and attempts < max_attempts:
+            attempts += 1
+            content_id = ids[random.randrange(len(ids))]
+            if content_id in picked_set or content_id in exclude:
+                continue
+            picked.append(content_id)
+            picked_set.add(content_id)
+
+        if len(picked) < k:
+            # Nearly everything is excluded, fall back to scanning what is left
+            remaining = [c for c in ids if c not in picked_set and c not in exclude]
+            picked += random.sample(remaining, min(k - len(picked), len(remaining)))
+
+        return picked
+
+
+content_index = ContentIdIndex()
+
+
+@event.listens_for(WikiContent, "after_insert")
+def _index_new_content(mapper, connection, target):
+    content_index.add(target.content_id)
+
+
+async def sample_content_ids(db: AsyncSession, count: int, exclude: Container[str]) -> List[str]:
+    """Pick `count` random cached content ids not in exclude"""
+    await content_index.ensure_loaded(db)
+    return content_index.sample(count, exclude)
@@ -0,0 +1,134 @@
+import hashlib
+import secrets
+from collections import OrderedDict
+from typing import Container, Iterable, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import View
+from services.shared_store import shared_store
+from services.metrics import record_error
+from config import SEEN_FILTER_BITS, SEEN_FILTER_HASHES, SEEN_MAX_SESSIONS, SEEN_SEED_LIMIT, SEEN_SESSION_TTL
+
+
+class SeenFilter:
+    """Fixed-size Bloom filter of content ids. False positives only skip an unseen article."""
+
+    def __init__(self, bits: int = SEEN_FILTER_BITS, hashes: int = SEEN_FILTER_HASHES, data: bytes = None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray((bits + 7) // 8)
+
+    def _positions(self, content_id: str):
+        # Content ids are already 64-bit hex digests, anything else gets hashed first
+        try:
+            value = int(content_id, 16)
+        except ValueError:
+            value = int.from_bytes(hashlib.sha256(content_id.encode('utf-8')).digest()[:8], 'big')
+        h1, h2 = value & 0xFFFFFFFF, (value >> 32) | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, content_id: str):
+        for position in self._positions(content_id):
+            self.data[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, content_id: str) -> bool:
+        return all(self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(content_id))
+
+
+class SeenSet:
+    """Membership test over several containers; ids added here stay local to the request"""
+
+    def __init__(self, *sources: Container[str]):
+        self._sources = sources
+        self._added = set()
+
+    def add(self, content_id: str):
+        self._added.add(content_id)
+
+    def __contains__(self, content_id: str) -> bool:
+        return content_id in self._added or any(content_id in source for source in self._sources)
+
+
+async def recent_views(db: AsyncSession, user_id: int, limit: int = SEEN_SEED_LIMIT) -> SeenFilter:
+    """Filter holding the user's `limit` most recently viewed articles"""
+    seen = SeenFilter()
+    result = await db.execute(
+        select(View.content_id).filter(View.user_id == user_id)
+        .order_by(View.id.desc()).limit(limit)
+    )
+    for content_id in result.scalars().all():
+        seen.add(content_id)
+    return seen
+
+
+class SeenSessions:
+    """Per-session seen filters keyed by an opaque cursor.
+
+    A new session is seeded from the user's most recent views, then every item the
+    feed serves through it is added. Sessions live in a local LRU, or in the shared
+    store when one is configured so any worker can continue a session.
+    """
+
+    def __init__(self, max_sessions: int = SEEN_MAX_SESSIONS, seed_limit: int = SEEN_SEED_LIMIT,
+                 ttl: float = SEEN_SESSION_TTL, store=shared_store):
+        self.max_sessions = max_sessions
+        self.seed_limit = seed_limit
+        self.ttl = ttl
+        self.store = store
+        self._sessions: "OrderedDict[str, Tuple[int, SeenFilter]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def _load(self, cursor: str) -> Optional[Tuple[int, SeenFilter]]:
+        if self.store is None:
+            session = self._sessions.get(cursor)
+            if session is not None:
+                self._sessions.move_to_end(cursor)
+            return session
+        try:
+            value = await self.store.get(f"seen:{cursor}")
+        except Exception as e:
+            print(f"Shared seen-set lookup failed: {e}")
+            record_error("shared_store")
+            return None
+        if value is None:
+            return None
+        return int.from_bytes(value[:8], 'big'), SeenFilter(data=value[8:])
+
+    async def _save(self, cursor: str, user_id: int, seen: SeenFilter):
+        if self.store is None:
+            self._sessions[cursor] = (user_id, seen)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return
+        try:
+            await self.store.set(f"seen:{cursor}", user_id.to_bytes(8, 'big') + bytes(seen.data), self.ttl)
+        except Exception as e:
+            print(f"Shared seen-set store failed: {e}")
+            record_error("shared_store")
+
+    async def resolve(self, db: AsyncSession, user_id: int, cursor: Optional[str]) -> Tuple[str, SeenFilter]:
+        """Return the cursor and filter for a session, starting a new one for unknown cursors"""
+        session = await self._load(cursor) if cursor else None
+        if session is not None and session[0] == user_id:
+            return cursor, session[1]
+
+        seen = await recent_views(db, user_id, self.seed_limit)
+        cursor = secrets.token_urlsafe(16)
+        await self._save(cursor, user_id, seen)
+        return cursor, seen
+
+    async def mark_served(self, cursor: str, user_id: int, seen: SeenFilter, items: Iterable[dict]):
+        for item in items:
+            seen.add(item['content_id'])
+        if self.store is not None:
+            await self._save(cursor, user_id, seen)
+
+
+seen_sessions = SeenSessions()
+
+
+def parse_exclude(exclude: str) -> set:
+    """Legacy comma-separated exclude list"""
+    return set([t.strip() for t in exclude.split(',') if t.strip()]) if exclude else set()
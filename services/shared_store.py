@@ -0,0 +1,84 @@
+import time
+from typing import Dict, Iterable, List, Optional
+from config import SHARED_CACHE_URL
+
+
+class MemoryStore:
+    """In-process stand-in for the shared tier, same interface as RedisStore"""
+
+    def __init__(self):
+        self._values: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl: float = None):
+        self._values[key] = (time.monotonic() + ttl if ttl else None, value)
+
+    async def set_many(self, values: Dict[str, bytes], ttl: float = None):
+        for key, value in values.items():
+            await self.set(key, value, ttl)
+
+    async def delete(self, keys: Iterable[str]):
+        for key in keys:
+            self._values.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+class RedisStore:
+    """Shared tier on Redis (pip install thinktok-backend[redis])"""
+
+    def __init__(self, url: str):
+        import redis.asyncio
+        self._redis = redis.asyncio.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(key)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return await self._redis.mget(keys) if keys else []
+
+    async def set(self, key: str, value: bytes, ttl: float = None):
+        await self._redis.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def set_many(self, values: Dict[str, bytes], ttl: float = None):
+        if not values:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, value, px=int(ttl * 1000) if ttl else None)
+            await pipe.execute()
+
+    async def delete(self, keys: Iterable[str]):
+        keys = list(keys)
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_store(url: str):
+    """Shared tier for SHARED_CACHE_URL, or None to keep caches per process"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    raise ValueError(f"Unsupported SHARED_CACHE_URL {url!r}")
+
+
+shared_store = create_store(SHARED_CACHE_URL)
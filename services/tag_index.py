@@ -0,0 +1,82 @@
+import asyncio
+import json
+import random
+from typing import Container, Dict, Iterable, List, Optional
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import WikiContent, ContentTag
+from services.wiki_service import item_tags
+
+
+class TagIndex:
+    """In-memory inverted index from interest tag to the cached articles carrying it.
+
+    Loaded from content_tags at startup and kept current by the WikiContent insert
+    hook below, so an interest slot can be filled from the cache without a query.
+    """
+
+    def __init__(self):
+        self._articles: Dict[str, List[str]] = {}
+        self._tags: Dict[str, List[str]] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            result = await db.execute(select(ContentTag.content_id, ContentTag.tag))
+            for content_id, tag in result.all():
+                self._articles.setdefault(tag, []).append(content_id)
+                self._tags.setdefault(content_id, []).append(tag)
+            self._loaded = True
+
+    def add(self, content_id: str, tags: Iterable[str]):
+        if content_id in self._tags:
+            return
+        self._tags[content_id] = list(dict.fromkeys(tags))
+        for tag in self._tags[content_id]:
+            self._articles.setdefault(tag, []).append(content_id)
+
+    def discard(self, content_id: str):
+        for tag in self._tags.pop(content_id, []):
+            articles = self._articles[tag]
+            articles.remove(content_id)
+            if not articles:
+                del self._articles[tag]
+
+    def sample(self, tag: str, exclude: Container[str] = ()) -> Optional[str]:
+        """A random cached article carrying tag and not in exclude, or None"""
+        articles = self._articles.get(tag)
+        if not articles:
+            return None
+        for _ in range(8):
+            content_id = articles[random.randrange(len(articles))]
+            if content_id not in exclude:
+                return content_id
+        remaining = [c for c in articles if c not in exclude]
+        return random.choice(remaining) if remaining else None
+
+    def stats(self) -> dict:
+        return {"loaded": self._loaded, "tags": len(self._articles), "articles": len(self._tags)}
+
+
+tag_index = TagIndex()
+
+
+@event.listens_for(WikiContent, "after_insert")
+def _index_new_content_tags(mapper, connection, target):
+    if tag_index.loaded:
+        tag_index.add(target.content_id, item_tags({
+            'categories': json.loads(target.categories) if target.categories else [],
+            'related': json.loads(target.related_links) if target.related_links else []
+        }))
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Cookie
+from sqlalchemy import select
+from database import AsyncSessionLocal, AsyncReadSessionLocal, READ_DATABASE_URL
+from models import User
+from config import USER_CACHE_SIZE
+
+
+class UserCache:
+    """Bounded LRU of username -> user id, so authenticated requests skip the users table.
+
+    Users are never renamed and ids never change, so entries cannot go stale.
+    Only existing users are cached; an unknown username is looked up again since
+    it may log in later. invalidate() is for removing users.
+    """
+
+    def __init__(self, max_items: int = USER_CACHE_SIZE):
+        self.max_items = max_items
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return dict(self._stats, size=len(self._ids), hit_ratio=self._stats["hits"] / lookups if lookups else 0.0)
+
+    def get(self, username: str) -> Optional[int]:
+        user_id = self._ids.get(username)
+        if user_id is None:
+            self._stats["misses"] += 1
+            return None
+        self._ids.move_to_end(username)
+        self._stats["hits"] += 1
+        return user_id
+
+    def put(self, username: str, user_id: int):
+        self._ids[username] = user_id
+        self._ids.move_to_end(username)
+        while len(self._ids) > self.max_items:
+            self._ids.popitem(last=False)
+
+    def invalidate(self, username: str = None):
+        """Forget one user, or everyone when no username is given"""
+        if username is None:
+            self._ids.clear()
+        else:
+            self._ids.pop(username, None)
+
+
+user_cache = UserCache()
+
+
+async def _lookup(session_factory, username: str) -> Optional[int]:
+    async with session_factory() as db:
+        result = await db.execute(select(User.id).where(User.username == username))
+        return result.scalar()
+
+
+async def resolve_user_id(username: Optional[str]) -> Optional[int]:
+    """Id of the user with this username from the cache, or one indexed lookup; None if unknown"""
+    if not username:
+        return None
+    user_id = user_cache.get(username)
+    if user_id is not None:
+        return user_id
+
+    user_id = await _lookup(AsyncReadSessionLocal, username)
+    if user_id is None and READ_DATABASE_URL:
+        # A replica may not have caught up with a user who just signed up
+        user_id = await _lookup(AsyncSessionLocal, username)
+    if user_id is not None:
+        user_cache.put(username, user_id)
+    return user_id
+
+
+async def current_user_id(username: str = Cookie(None)) -> Optional[int]:
+    """Route dependency: id of the user named by the username cookie, None when absent or unknown"""
+    return await resolve_user_id(username)
@@ -0,0 +1,316 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Sequence
+import requests
+import wikipedia
+from wikipedia.exceptions import DisambiguationError, PageError, RedirectError
+from config import (
+    WIKI_FETCH_CONCURRENCY, WIKI_FETCH_TIMEOUT, WIKI_FETCH_RETRIES, WIKI_FETCH_BACKOFF,
+    WIKI_BATCH_ENABLED, WIKI_BATCH_SIZE, WIKI_BATCH_CONTINUATIONS,
+    WIKI_NEGATIVE_TTL, WIKI_NEGATIVE_MAX, WIKI_BREAKER_THRESHOLD, WIKI_BREAKER_RESET
+)
+from services.metrics import record_wiki_fetch
+
+# Errors that will not go away by asking again
+PERMANENT_ERRORS = (DisambiguationError, PageError, RedirectError)
+
+# The wikipedia library is blocking and has no request timeout, so a timed out call keeps
+# its thread busy until the socket gives up. Size the pool above the concurrency limit
+# so abandoned calls do not starve new ones.
+_executor = ThreadPoolExecutor(max_workers=WIKI_FETCH_CONCURRENCY * 2, thread_name_prefix="wiki-fetch")
+_semaphore: Optional[asyncio.Semaphore] = None
+
+# Everything an article needs in one MediaWiki query, for every page it names or generates
+PAGE_QUERY = {
+    "prop": "extracts|pageimages|links|categories|pageprops",
+    "exintro": "", "explaintext": "", "exlimit": "max",
+    "piprop": "original", "pilimit": "max",
+    "plnamespace": 0, "pllimit": "max",
+    "clshow": "!hidden", "cllimit": "max",
+    "ppprop": "disambiguation",
+    "redirects": "",
+}
+
+# Random articles are fetched a batch at a time and handed out one by one
+_random_pages: Deque[dict] = deque()
+_random_lock: Optional[asyncio.Lock] = None
+
+
+class WikiFetchError(Exception):
+    """Raised when Wikipedia could not be reached after all retries"""
+
+
+class WikiUnavailableError(WikiFetchError):
+    """Raised without calling Wikipedia while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing.
+
+    Opens after `threshold` failed attempts in a row; while open every call is
+    rejected at once. After `reset_timeout` seconds one trial call goes through:
+    success closes the breaker, failure keeps it open for another `reset_timeout`.
+    Answers such as a missing page count as success, the upstream is up.
+    """
+
+    def __init__(self, threshold: int = WIKI_BREAKER_THRESHOLD, reset_timeout: float = WIKI_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._stats = {"failures": 0, "opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    @property
+    def available(self) -> bool:
+        """False while calls would be rejected; feed routes then serve from the cache only"""
+        return self.state != "open"
+
+    def stats(self) -> dict:
+        return dict(self._stats, state=self.state, consecutive_failures=self._failures)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half_open":
+            # Let this call through as the trial, the rest stay rejected until it reports back
+            self._opened_at = time.monotonic()
+            return True
+        if state == "open":
+            self._stats["rejected"] += 1
+            return False
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        self._stats["failures"] += 1
+        if self._failures >= self.threshold:
+            if self._opened_at is None:
+                self._stats["opened"] += 1
+            self._opened_at = time.monotonic()
+
+
+class NegativeCache:
+    """Titles Wikipedia has no usable article for (missing, disambiguation, invalid), kept `ttl` seconds"""
+
+    def __init__(self, ttl: float = WIKI_NEGATIVE_TTL, max_items: int = WIKI_NEGATIVE_MAX):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._titles: "OrderedDict[str, float]" = OrderedDict()
+        self._stats = {"hits": 0, "added": 0}
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def __contains__(self, title: str) -> bool:
+        expires_at = self._titles.get(title)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._titles[title]
+            return False
+        self._stats["hits"] += 1
+        return True
+
+    def stats(self) -> dict:
+        return dict(self._stats, size=len(self._titles))
+
+    def add(self, title: str):
+        self._titles[title] = time.monotonic() + self.ttl
+        self._titles.move_to_end(title)
+        self._stats["added"] += 1
+        while len(self._titles) > self.max_items:
+            self._titles.popitem(last=False)
+
+
+wiki_breaker = CircuitBreaker()
+negative_titles = NegativeCache()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(WIKI_FETCH_CONCURRENCY)
+    return _semaphore
+
+
+def _load_page(title: str) -> dict:
+    """Load a page and all the lazy properties we store (runs in a worker thread)"""
+    page = wikipedia.page(title, auto_suggest=False)
+    return {
+        "title": page.title,
+        "summary": page.summary,
+        "image_url": page.images[0] if page.images else None,
+        "links": page.links[:10],
+        "categories": page.categories[:10] if hasattr(page, 'categories') else []
+    }
+
+
+def _query(params: dict) -> dict:
+    """One MediaWiki query API request (runs in a worker thread)"""
+    response = requests.get(
+        wikipedia.wikipedia.API_URL,
+        params=dict(params, action="query", format="json"),
+        headers={"User-Agent": wikipedia.wikipedia.USER_AGENT},
+        timeout=WIKI_FETCH_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _load_batch(params: dict) -> Dict[str, dict]:
+    """Run PAGE_QUERY for the pages `params` name or generate (runs in a worker thread).
+
+    Returns pages keyed by their title, plus the requested titles that were
+    normalized or redirected to them. Missing and disambiguation pages are left
+    out. All pages of a request share one 500-link budget, so continuations are
+    followed until every page has its first links or WIKI_BATCH_CONTINUATIONS run out.
+    """
+    pages: Dict[str, dict] = {}
+    aliases: Dict[str, str] = {}
+    query_params = dict(PAGE_QUERY, **params)
+    for _ in range(WIKI_BATCH_CONTINUATIONS + 1):
+        data = _query(query_params)
+        query = data.get("query", {})
+        for alias in query.get("normalized", []) + query.get("redirects", []):
+            aliases[alias["from"]] = alias["to"]
+        for page in query.get("pages", {}).values():
+            merged = pages.setdefault(page["title"], {})
+            for key, value in page.items():
+                if isinstance(value, list):
+                    merged.setdefault(key, []).extend(value)
+                else:
+                    merged[key] = value
+        # batchcomplete: every property of these pages is in; a continue left then only
+        # advances the generator (the random generator always offers one) to other pages
+        if "batchcomplete" in data or "continue" not in data or all(
+                len(page.get("links", [])) >= 10 for page in pages.values() if "missing" not in page):
+            break
+        # The whole continue block goes back: before batchcomplete its generator key
+        # ("continue": "grncontinue||") holds the generator on the same pages
+        query_params = dict(PAGE_QUERY, **params, **data["continue"])
+
+    loaded = {}
+    for title, page in pages.items():
+        if "missing" in page or "invalid" in page or "disambiguation" in page.get("pageprops", {}):
+            continue
+        loaded[title] = {
+            "title": title,
+            "summary": page.get("extract", ""),
+            "image_url": page.get("original", {}).get("source"),
+            "links": [link["title"] for link in page.get("links", [])][:10],
+            "categories": [category["title"].split(":", 1)[-1] for category in page.get("categories", [])][:10]
+        }
+    # Requested title -> normalized title -> redirect target
+    for requested in aliases:
+        resolved = requested
+        while resolved in aliases and resolved not in loaded:
+            resolved = aliases[resolved]
+        if resolved in loaded:
+            loaded.setdefault(requested, loaded[resolved])
+    return loaded
+
+
+async def _call(fn, *args):
+    """Run a blocking Wikipedia call in the pool with a concurrency cap, timeout and retries"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    for attempt in range(WIKI_FETCH_RETRIES + 1):
+        if not wiki_breaker.allow():
+            record_wiki_fetch(time.perf_counter() - started, "rejected")
+            raise WikiUnavailableError(f"{fn.__name__}{args} skipped, Wikipedia circuit breaker is open")
+        try:
+            async with _get_semaphore():
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(_executor, fn, *args), WIKI_FETCH_TIMEOUT
+                )
+            wiki_breaker.record_success()
+            record_wiki_fetch(time.perf_counter() - started, "ok")
+            return result
+        except PERMANENT_ERRORS:
+            wiki_breaker.record_success()
+            record_wiki_fetch(time.perf_counter() - started, "not_found")
+            raise
+        except Exception as e:
+            wiki_breaker.record_failure()
+            if attempt == WIKI_FETCH_RETRIES:
+                record_wiki_fetch(time.perf_counter() - started, "error")
+                raise WikiFetchError(f"{fn.__name__}{args} failed after {attempt + 1} attempts: {e!r}") from e
+            # Exponential backoff with jitter, outside the semaphore
+            await asyncio.sleep(WIKI_FETCH_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+async def fetch_random_title() -> str:
+    """Get one random article title"""
+    return await _call(wikipedia.random)
+
+
+async def fetch_page(title: str) -> dict:
+    """Fetch a page with summary, first image, links and categories"""
+    if title in negative_titles:
+        raise PageError(None, title)
+    if not WIKI_BATCH_ENABLED:
+        try:
+            return await _call(_load_page, title)
+        except PERMANENT_ERRORS:
+            negative_titles.add(title)
+            raise
+    page = (await fetch_pages([title])).get(title)
+    if page is None:
+        raise PageError(None, title)
+    return page
+
+
+async def fetch_pages(titles: Sequence[str]) -> Dict[str, dict]:
+    """Fetch many pages, WIKI_BATCH_SIZE per request; keyed by requested title, missing pages left out"""
+    titles = [title for title in dict.fromkeys(titles) if title not in negative_titles]
+    pages = {}
+    for start in range(0, len(titles), WIKI_BATCH_SIZE):
+        batch = titles[start:start + WIKI_BATCH_SIZE]
+        loaded = await _call(_load_batch, {"titles": "|".join(batch)})
+        for title in batch:
+            if title not in loaded:
+                negative_titles.add(title)
+        pages.update(loaded)
+    return pages
+
+
+async def fetch_random_pages(count: int) -> List[dict]:
+    """Up to `count` random articles in one request per WIKI_BATCH_SIZE"""
+    pages = []
+    while len(pages) < count:
+        batch = min(WIKI_BATCH_SIZE, count - len(pages))
+        loaded = await _call(_load_batch, {"generator": "random", "grnnamespace": 0, "grnlimit": batch})
+        if not loaded:
+            break
+        pages += list(loaded.values())[:count - len(pages)]
+    return pages
+
+
+async def fetch_random_page() -> dict:
+    """One random article, from a buffer refilled WIKI_BATCH_SIZE articles per request"""
+    if not WIKI_BATCH_ENABLED:
+        return await fetch_page(await fetch_random_title())
+    global _random_lock
+    if _random_lock is None:
+        _random_lock = asyncio.Lock()
+    # Callers that find the buffer empty wait for one refill instead of each sending their own
+    async with _random_lock:
+        if not _random_pages:
+            _random_pages.extend(await fetch_random_pages(WIKI_BATCH_SIZE))
+        if not _random_pages:
+            raise PageError(None, "random")
+        return _random_pages.popleft()
@@ -1,10 +1,13 @@
 import hashlib
 import json
-from typing import Optional
-import wikipedia
+from typing import Dict, Iterable, List, Optional, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from models import WikiContent
-from datetime import datetime, timezone
+from sqlalchemy import select, insert
+from models import WikiContent, ContentTag
+from services.wiki_fetcher import fetch_page, fetch_pages, fetch_random_page, fetch_random_pages
+from services.sampling_service import content_index, sample_content_ids
+from services.payload_cache import payload_cache, access_tracker
+from services.metrics import record_error
 
 
 def generate_content_id(title: str) -> str:
@@ -12,58 +15,194 @@ def generate_content_id(title: str) -> str:
     return hashlib.sha256(title.encode('utf-8')).hexdigest()[:16]
 
 
+def content_to_item(content: WikiContent) -> dict:
+    """Build the feed item payload for a cached article"""
+    return {
+        "content_id": content.content_id,
+        "title": content.title,
+        "summary": content.summary[:200] + "..." if len(content.summary) > 200 else content.summary[:200],
+        "whole_summary": content.summary,
+        "image": content.image_url,
+        "related": json.loads(content.related_links) if content.related_links else [],
+        "categories": json.loads(content.categories) if content.categories else []
+    }
+
+
+def item_tags(item: dict) -> List[str]:
+    """Interest tags for an article payload: up to 10 categories and 5 related links, 50 chars each"""
+    try:
+        tags = item.get('categories', [])[:10] + item.get('related', [])[:5]
+    except:
+        tags = []
+    return [tag[:50] for tag in tags[:15]]
+
+
+async def load_content_tags(db: AsyncSession, content_ids: Iterable[str]) -> Dict[str, List[str]]:
+    """Tags per cached article in one query; ids that are not cached are left out"""
+    result = await db.execute(
+        select(WikiContent.content_id, ContentTag.tag)
+        .outerjoin(ContentTag, ContentTag.content_id == WikiContent.content_id)
+        .where(WikiContent.content_id.in_(set(content_ids)))
+    )
+    tags = {}
+    for content_id, tag in result.all():
+        tags.setdefault(content_id, [])
+        if tag is not None:
+            tags[content_id].append(tag)
+    return tags
+
+
+async def load_items(db: AsyncSession, content_ids: List[str]) -> List[dict]:
+    """Payloads for cached articles in the given order; only payload cache misses touch the DB"""
+    items = {}
+    missing = []
+    for content_id in content_ids:
+        item = payload_cache.get(content_id)
+        if item is not None:
+            items[content_id] = item
+        else:
+            missing.append(content_id)
+
+    if missing:
+        items.update(await payload_cache.get_shared(missing))
+        missing = [content_id for content_id in missing if content_id not in items]
+
+    if missing:
+        built = {}
+        result = await db.execute(select(WikiContent).where(WikiContent.content_id.in_(missing)))
+        for content in result.scalars().all():
+            item = content_to_item(content)
+            payload_cache.put(content.content_id, item)
+            items[content.content_id] = built[content.content_id] = item
+        await payload_cache.put_shared(built)
+
+    return [items[content_id] for content_id in content_ids if content_id in items]
+
+
+async def get_cached_feed_items(db: AsyncSession, count: int, exclude: set) -> list:
+    """Get random items from cache (DB), no Wikipedia API calls"""
+    content_ids = await sample_content_ids(db, count, exclude)
+    items = await load_items(db, content_ids)
+
+    # Rows that have gone away since the id index was built
+    found = {item['content_id'] for item in items}
+    for content_id in content_ids:
+        if content_id not in found:
+            content_index.discard(content_id)
+
+    return items
+
+
+def _add_page(db: AsyncSession, content_id: str, page: dict) -> dict:
+    """Stage a fetched page and its tags for insert, return its payload (flushed and committed by the caller)"""
+    new_content = WikiContent(
+        content_id=content_id,
+        title=page['title'],
+        summary=page['summary'],
+        image_url=page['image_url'],
+        related_links=json.dumps(page['links']),
+        categories=json.dumps(page['categories'])
+    )
+    db.add(new_content)
+    return content_to_item(new_content)
+
+
+async def _insert_tags(db: AsyncSession, items: Dict[str, dict]):
+    rows = [
+        {"content_id": content_id, "tag": tag}
+        for content_id, item in items.items()
+        for tag in dict.fromkeys(item_tags(item))
+    ]
+    if rows:
+        await db.flush()
+        await db.execute(insert(ContentTag), rows)
+
+
 async def get_or_create_wiki_content(db: AsyncSession, title: str = None) -> Optional[dict]:
     """Get wiki content from cache or fetch from Wikipedia API"""
+    page = None
     if not title:
-        title = wikipedia.random()
+        try:
+            # Random articles arrive whole, several per request
+            page = await fetch_random_page()
+        except Exception as e:
+            print(f"Error fetching random Wikipedia article: {e}")
+            record_error("wikipedia")
+            return None
+        title = page['title']
 
     content_id = generate_content_id(title)
 
-    # Try to get from cache first
-    from sqlalchemy import select
+    # Try the payload cache, then the DB cache. Access counts are flushed in batches.
+    item = payload_cache.get(content_id) or (await payload_cache.get_shared([content_id])).get(content_id)
+    if item is not None:
+        access_tracker.record(content_id)
+        return item
+
     result = await db.execute(select(WikiContent).filter(WikiContent.content_id == content_id))
     cached = result.scalars().first()
 
     if cached:
-        cached.last_accessed = datetime.now(timezone.utc)
-        cached.access_count += 1
-        await db.commit()
+        item = content_to_item(cached)
+        payload_cache.put(content_id, item)
+        await payload_cache.put_shared({content_id: item})
+        access_tracker.record(content_id)
+        return item
 
-        return {
-            "content_id": cached.content_id,
-            "title": cached.title,
-            "summary": cached.summary[:200] + "..." if len(cached.summary) > 200 else cached.summary[:200],
-            "whole_summary": cached.summary,
-            "image": cached.image_url,
-            "related": json.loads(cached.related_links) if cached.related_links else [],
-            "categories": json.loads(cached.categories) if cached.categories else []
-        }
-
-    # Not in cache, fetch from Wikipedia
+    # Not in cache, fetch from Wikipedia. End the read transaction first so other
+    # sessions can write while this one waits on the network.
+    await db.commit()
     try:
-        page = wikipedia.page(title, auto_suggest=False)
-
-        full_summary = page.summary
-        new_content = WikiContent(
-            content_id=content_id,
-            title=page.title,
-            summary=full_summary,
-            image_url=page.images[0] if page.images else None,
-            related_links=json.dumps(page.links[:10]),
-            categories=json.dumps(page.categories[:10] if hasattr(page, 'categories') else [])
-        )
-        db.add(new_content)
+        if page is None:
+            page = await fetch_page(title)
+
+        item = _add_page(db, content_id, page)
+        await _insert_tags(db, {content_id: item})
         await db.commit()
 
-        return {
-            "content_id": new_content.content_id,
-            "title": new_content.title,
-            "summary": full_summary[:200] + "..." if len(full_summary) > 200 else full_summary[:200],
-            "whole_summary": full_summary,
-            "image": new_content.image_url,
-            "related": json.loads(new_content.related_links),
-            "categories": json.loads(new_content.categories)
-        }
+        payload_cache.put(content_id, item)
+        await payload_cache.put_shared({content_id: item})
+        return dict(item)
     except Exception as e:
         print(f"Error fetching Wikipedia content: {e}")
+        record_error("wikipedia")
         return None
+
+
+async def cache_wiki_contents(db: AsyncSession, titles: Sequence[str] = (), random_count: int = 0) -> List[dict]:
+    """Fetch and cache the uncached `titles` plus `random_count` random articles, many per request.
+
+    Returns the payloads of the newly cached articles. Titles Wikipedia has no
+    page for are skipped.
+    """
+    wanted = {generate_content_id(title): title for title in titles}
+    if wanted:
+        result = await db.execute(select(WikiContent.content_id).where(WikiContent.content_id.in_(wanted)))
+        for content_id in result.scalars().all():
+            del wanted[content_id]
+    # End the read transaction while waiting on the network
+    await db.commit()
+
+    pages = {}
+    fetched = await fetch_pages(list(wanted.values())) if wanted else {}
+    for content_id, title in wanted.items():
+        if title in fetched:
+            pages[content_id] = fetched[title]
+    if random_count > 0:
+        for page in await fetch_random_pages(random_count):
+            pages.setdefault(generate_content_id(page['title']), page)
+
+    if pages:
+        # Random articles may already be cached
+        result = await db.execute(select(WikiContent.content_id).where(WikiContent.content_id.in_(pages)))
+        for content_id in result.scalars().all():
+            del pages[content_id]
+
+    items = {content_id: _add_page(db, content_id, page) for content_id, page in pages.items()}
+    await _insert_tags(db, items)
+    await db.commit()
+
+    for content_id, item in items.items():
+        payload_cache.put(content_id, item)
+    await payload_cache.put_shared(items)
+    return [dict(item) for item in items.values()]
@@ -5,10 +5,13 @@ class ThinkTok {
         this.currentUser = null;
         this.feedItems = [];
         this.viewedHistory = this.getViewedHistory();
+        this.feedCursor = null;
         this.trackedCards = new Set();
         this.cardViewStartTimes = new Map();
         this.currentView = 'feed';
         this.isLoading = false;
+        // Open comment thread: { contentId, nextAfter, loading, ids }
+        this.commentThread = null;
     }
 
     // LocalStorage
@@ -85,17 +88,26 @@ class ThinkTok {
     }
 
     // Feed
-    async loadFeed() {
-        const exclude = this.viewedHistory.join(',');
-        const data = await this.api(`/feed?exclude=${encodeURIComponent(exclude)}`);
+    // The server tracks what this session has seen; we only pass back its opaque cursor
+    feedQuery() {
+        return this.feedCursor ? `?cursor=${encodeURIComponent(this.feedCursor)}` : '';
+    }
+
+    async loadFeedPage(endpoint) {
+        const data = await this.api(`${endpoint}${this.feedQuery()}`);
+        if (data.cursor) {
+            this.feedCursor = data.cursor;
+        }
         return data.items;
     }
 
+    async loadFeed() {
+        return this.loadFeedPage('/feed');
+    }
+
     async loadInitialAdditionalItems() {
         // Load additional items after initial feed is displayed
-        const exclude = this.viewedHistory.join(',');
-        const data = await this.api(`/feed/more?exclude=${encodeURIComponent(exclude)}`);
-        return data.items;
+        return this.loadFeedPage('/feed/more');
     }
 
     async loadMore() {
@@ -104,13 +116,12 @@ class ThinkTok {
         this.isLoading = true;
         this.showLoading(true);
 
-        const exclude = this.viewedHistory.join(',');
-        const data = await this.api(`/load_more?exclude=${encodeURIComponent(exclude)}`);
+        const items = await this.loadFeedPage('/load_more');
 
         this.isLoading = false;
         this.showLoading(false);
 
-        return data.items;
+        return items;
     }
 
     showLoading(show) {
@@ -130,8 +141,9 @@ class ThinkTok {
         return data.is_liked;
     }
 
-    async getComments(contentId) {
-        const data = await this.api(`/comments/${contentId}`);
+    async getComments(contentId, after = 0) {
+        const query = after ? `?after=${after}` : '';
+        const data = await this.api(`/comments/${contentId}${query}`);
         return data;
     }
 
@@ -280,6 +292,7 @@ class ThinkTok {
                 container.classList.remove('translate-y-full');
             }, 10);
 
+            this.commentThread = { contentId, nextAfter: data.next_after, loading: false, ids: new Set() };
             this.renderComments(data.comments, data.page_title);
         }).catch(error => {
             console.error('Failed to load comments:', error);
@@ -289,6 +302,7 @@ class ThinkTok {
 
     closeComments() {
         console.log('Closing comments');
+        this.commentThread = null;
         const sheet = document.getElementById('comment-sheet');
         const overlay = sheet.querySelector('.overlay-backdrop');
         const container = document.getElementById('sheet-content');
@@ -315,12 +329,50 @@ class ThinkTok {
             return;
         }
 
-        container.innerHTML = comments.map(c => `
+        comments.forEach(c => this.commentThread?.ids.add(c.id));
+        container.innerHTML = comments.map(c => this.commentHtml(c)).join('');
+        this.loadMoreCommentsIfShort();
+    }
+
+    commentHtml(comment) {
+        return `
             <div class="mb-4 p-3 bg-gray-800 rounded-lg">
-                <p class="font-bold text-sm text-blue-400">${this.escapeHtml(c.user.username)}</p>
-                <p class="text-gray-200">${this.escapeHtml(c.text)}</p>
+                <p class="font-bold text-sm text-blue-400">${this.escapeHtml(comment.user.username)}</p>
+                <p class="text-gray-200">${this.escapeHtml(comment.text)}</p>
             </div>
-        `).join('');
+        `;
+    }
+
+    // Fetch the next page of the open thread, skipping comments already shown
+    async loadMoreComments() {
+        const thread = this.commentThread;
+        if (!thread || thread.loading || !thread.nextAfter) return;
+
+        thread.loading = true;
+        try {
+            const data = await this.getComments(thread.contentId, thread.nextAfter);
+            // The sheet may have been closed or switched to another article meanwhile
+            if (this.commentThread !== thread) return;
+
+            const container = document.getElementById('comments-list');
+            const fresh = data.comments.filter(c => !thread.ids.has(c.id));
+            fresh.forEach(c => thread.ids.add(c.id));
+            container.insertAdjacentHTML('beforeend', fresh.map(c => this.commentHtml(c)).join(''));
+            thread.nextAfter = data.next_after;
+        } catch (error) {
+            console.error('Failed to load more comments:', error);
+        } finally {
+            thread.loading = false;
+        }
+        this.loadMoreCommentsIfShort();
+    }
+
+    // Keep loading while the list does not fill the sheet, scrolling cannot trigger it then
+    loadMoreCommentsIfShort() {
+        const container = document.getElementById('comments-list');
+        if (container && container.scrollHeight <= container.clientHeight) {
+            this.loadMoreComments();
+        }
     }
 
     appendComment(comment) {
@@ -337,14 +389,9 @@ class ThinkTok {
             container.innerHTML = '';
         }
 
-        const commentHtml = `
-            <div class="mb-4 p-3 bg-gray-800 rounded-lg">
-                <p class="font-bold text-sm text-blue-400">${this.escapeHtml(comment.user.username)}</p>
-                <p class="text-gray-200">${this.escapeHtml(comment.text)}</p>
-            </div>
-        `;
-
-        container.insertAdjacentHTML('beforeend', commentHtml);
+        // A later page would contain it again
+        this.commentThread?.ids.add(comment.id);
+        container.insertAdjacentHTML('beforeend', this.commentHtml(comment));
         console.log('Comment added to DOM');
     }
 
@@ -685,6 +732,16 @@ class ThinkTok {
             commentForm.addEventListener('submit', (e) => this.handleCommentSubmit(e));
         }
 
+        // Load the next page of comments near the bottom of the list
+        const commentsList = document.getElementById('comments-list');
+        if (commentsList) {
+            commentsList.addEventListener('scroll', () => {
+                if (commentsList.scrollTop + commentsList.clientHeight >= commentsList.scrollHeight - 200) {
+                    this.loadMoreComments();
+                }
+            });
+        }
+
         // Event delegation for close comments (click on overlay or close button)
         document.addEventListener('click', (e) => {
             // Check if clicking the overlay or close button